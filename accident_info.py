@@ -155,12 +155,16 @@ def _chat_create(messages: list, model: str):
 
 try:
     from fetcher import extract_article_text as _extract_article_text
+    from fetcher import extract_many as _extract_many
 except Exception:
     # fallback: provide a minimal wrapper that returns empty strings so tests that import
     # this module don't break if fetcher can't be imported (e.g., missing deps)
     def _extract_article_text(url: str, timeout: int = 25):
         return "", "", url
 
+    def _extract_many(urls, max_workers: int = 8, extract=None):
+        return [(extract or _extract_article_text)(u) for u in urls]
+
 # module logger
 logger = logging.getLogger(__name__)
 try:
@@ -339,7 +343,10 @@ def batch_extract_accident_info(
         full_texts = []
         out_dirs = []
         final_urls = []
-        for u in batch:
+        # fetch the whole batch concurrently (network-bound); the module-level
+        # _extract_article_text is passed through so test patches still apply
+        fetched = _extract_many(batch, extract=_extract_article_text)
+        for u, res in zip(batch, fetched):
             try:
                 od = _ensure_outdir(u, base_output)
             except Exception:
@@ -350,9 +357,7 @@ def batch_extract_accident_info(
                 )
                 od.mkdir(parents=True, exist_ok=True)
             out_dirs.append(od)
-            # extract text deterministically; accept either (full, focused)
-            # or (full, focused, final_url)
-            res = _extract_article_text(u)
+            # accept either (full, focused) or (full, focused, final_url)
             if isinstance(res, tuple) and len(res) == 3:
                 full_text, focused, final_u = res
             elif isinstance(res, tuple) and len(res) == 2:
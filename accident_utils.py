@@ -12,16 +12,24 @@ from urllib.parse import urlparse
 from time_utils import now_pst_filename_ts
 
 
-def _slugify(text: str) -> str:
+def slugify(text: str) -> str:
     return re.sub(r"[^a-zA-Z0-9_-]", "_", text)
 
 
+_slugify = slugify  # older name, still imported by the extraction modules
+
+
 def _hash(text: str) -> str:
     return hashlib.md5(text.encode("utf-8")).hexdigest()[:10]
 
 
+def url_domain(url: str) -> str:
+    """Host name used for artifact directories (every 'www.' removed, as the writers always have)."""
+    return urlparse(url).netloc.replace("www.", "")
+
+
 def _ensure_outdir(url: str, base_output: str = "artifacts") -> Path:
-    domain = urlparse(url).netloc.replace("www.", "")
+    domain = url_domain(url)
     try:
         ts = now_pst_filename_ts()
     except Exception:
@@ -142,10 +150,12 @@ def parse_publication_date(text: str) -> str | None:
 
 
 __all__ = [
+    "slugify",
     "_slugify",
     "_hash",
     "_ensure_outdir",
     "_iso_or_none",
     'parse_publication_date',
     'parse_report_author',
+    'url_domain',
 ]
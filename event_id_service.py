@@ -28,6 +28,7 @@ from typing import Any, Dict, List
 
 from accident_llm import _chat_create as _llm_chat_create, _OPENAI_AVAILABLE, _supports_temperature
 from openai_call_manager import can_make_call, record_call
+from json_utils import read_json, write_json
 
 # Best-effort .env loading like other modules
 try:
@@ -110,8 +111,7 @@ def make_cache_key(records: List[dict]) -> str:
 def load_cache() -> Dict[str, Any]:
     if CACHE_PATH.exists():
         try:
-            with open(CACHE_PATH, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            return read_json(CACHE_PATH)
         except Exception:
             return {}
     return {}
@@ -119,8 +119,7 @@ def load_cache() -> Dict[str, Any]:
 
 def save_cache(cache: Dict[str, Any]):
     try:
-        with open(CACHE_PATH, 'w', encoding='utf-8') as f:
-            json.dump(cache, f, ensure_ascii=False, indent=2)
+        write_json(CACHE_PATH, cache)
     except Exception:
         pass
 
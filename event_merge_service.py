@@ -32,6 +32,7 @@ from accident_llm import _chat_create as _llm_chat_create, _OPENAI_AVAILABLE
 from openai_call_manager import can_make_call, record_call
 from config import EVENT_MERGE_MODEL, EVENT_FUSION_MODEL, SERVICE_TIER
 from token_tracker import add_usage
+from json_utils import read_json, write_json
 
 # Best-effort .env loading
 try:
@@ -159,8 +160,7 @@ def _fuse_prompt(records: List[dict]) -> str:
 def _cache_load(p: Path) -> Dict[str, Any]:
     if p.exists():
         try:
-            with open(p, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            return read_json(p)
         except Exception:
             return {}
     return {}
@@ -168,8 +168,7 @@ def _cache_load(p: Path) -> Dict[str, Any]:
 
 def _cache_save(p: Path, data: Dict[str, Any]):
     try:
-        with open(p, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        write_json(p, data)
     except Exception:
         pass
 
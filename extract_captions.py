@@ -17,6 +17,7 @@ import hashlib
 import requests
 import signal
 import logging
+import threading
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 from urllib.parse import urlparse, urljoin
@@ -36,10 +37,26 @@ OCR_PREPROCESS = os.getenv("OCR_PREPROCESS", "false").lower() in ("1", "true", "
 # tokens that indicate an image is likely a decorative logo/wordmark/affiliate asset and should be
 # skipped at extraction time to avoid downloading and sending to expensive OCR/LLM stages.
 IRRELEVANT_TOKENS = set(t.strip().lower() for t in os.getenv('IRRELEVANT_TOKENS', 'logo,wordmark,badge,brand,promo,affiliate,watermark,trademark,ads,advert,avatar,favicon,icon,share,share-icons,share-icon,social,button,close,thumb,thumbnail,sprite,inline-icon').split(','))
+# one precompiled alternation instead of a substring scan per token; (?!) never matches
+_IRRELEVANT_RE = re.compile('|'.join(re.escape(t) for t in sorted(IRRELEVANT_TOKENS) if t) or '(?!)')
+
+# Patterns used per caption / per image candidate, compiled once
+_RE_SLUG_UNSAFE = re.compile(r'[^a-zA-Z0-9_-]')
+_RE_IMAGE_CREDIT = re.compile(r'\|\s*Image:.*$')
+_RE_WS = re.compile(r'\s+')
+_RE_JS_REDIRECT = re.compile(r"location\.href\s*=|location\.replace\(|window\.location", re.IGNORECASE)
+_RE_CSS_URL = re.compile(r'url\(([^)]+)\)')
+_RE_HTTP_URL = re.compile(r'https?://[^\s\"\'>)]+')
+_RE_WP_UPLOAD_URL = re.compile(r'https?://[^\s\"\'>)]+wp-content/uploads[^\s\"\'>)]+')
+_RE_RELEVANT_CAPTION = re.compile(r"(rescue|helicopter|avalanche|mountain|peak|ridge|summit|snow|glacier|teams|SAR|cliff|fatal|missing)", re.IGNORECASE)
+_RE_UPLOAD_PATH = re.compile(r"/(wp-content|uploads|media|images)/", re.IGNORECASE)
+_RE_IMAGE_EXT = re.compile(r"\.(jpg|jpeg|png|webp)$", re.IGNORECASE)
 
 # Minimum image dimensions to keep (filter out marketing/avatars)
 MIN_IMG_WIDTH = 300
 MIN_IMG_HEIGHT = 200
+# Smaller files are icons/spacers: skipped before download and before OCR.
+MIN_IMG_BYTES = int(os.getenv('MIN_IMG_BYTES', '4096'))
 
 # Optional OCR fallback (Playwright)
 try:
@@ -48,6 +65,17 @@ try:
 except ImportError:
     OCR_AVAILABLE = False
 
+# In-process libtesseract binding: loads the language model once instead of
+# spawning a tesseract subprocess per image. pytesseract is the fallback.
+try:
+    from tesserocr import PyTessBaseAPI  # type: ignore
+    _HAS_TESSEROCR = True
+except Exception:
+    PyTessBaseAPI = None  # type: ignore
+    _HAS_TESSEROCR = False
+_TESS_API = None
+_TESS_LOCK = threading.Lock()  # libtesseract handles are not thread-safe
+
 # configure logging
 LOG_LEVEL = os.getenv("EXTRACT_CAPTIONS_LOG_LEVEL", "INFO")
 logging.basicConfig(level=LOG_LEVEL)
@@ -112,11 +140,11 @@ def get_with_retries(url: str, timeout: int = 20, headers: dict | None = None) -
 
 # -------------------- Utilities --------------------
 def slugify(text: str) -> str:
-    return re.sub(r'[^a-zA-Z0-9_-]', '_', text)
+    return _RE_SLUG_UNSAFE.sub('_', text)
 
 def clean_caption(text: str) -> str:
-    text = re.sub(r'\|\s*Image:.*$', '', text)
-    text = re.sub(r'\s+', ' ', text)
+    text = _RE_IMAGE_CREDIT.sub('', text)
+    text = _RE_WS.sub(' ', text)
     return text.strip()
 
 def hash_url(url: str) -> str:
@@ -129,7 +157,7 @@ def is_stray_url(img_url: str) -> bool:
     if any(bad in low for bad in ["gravatar.com", "avatar", "favicon"]):
         return True
     # also treat explicit small-looking tokens as stray in the URL
-    if any(tok in low for tok in IRRELEVANT_TOKENS):
+    if _IRRELEVANT_RE.search(low):
         return True
     return False
 
@@ -137,11 +165,7 @@ def is_stray_url(img_url: str) -> bool:
 def contains_irrelevant_token(text: str | None) -> bool:
     if not text:
         return False
-    tl = text.lower()
-    for tok in IRRELEVANT_TOKENS:
-        if tok and tok in tl:
-            return True
-    return False
+    return _IRRELEVANT_RE.search(text.lower()) is not None
 
 def is_stray_file(filepath: str) -> bool:
     """Reject tiny or broken files based on actual pixel dimensions."""
@@ -153,6 +177,44 @@ def is_stray_file(filepath: str) -> bool:
         return True
 
 
+def preprocess_image(pil_img: Image.Image) -> Image.Image:
+    """Upscale, grayscale, autocontrast and binarize an image for Tesseract."""
+    # ensure RGB then scale up if small
+    pil_img = pil_img.convert('RGB')
+    maxw = int(os.getenv('OCR_MAX_WIDTH', '1200'))
+    if pil_img.width < maxw:
+        ratio = maxw / pil_img.width
+        nw = maxw
+        nh = int(pil_img.height * ratio)
+        pil_img = pil_img.resize((nw, nh), Image.LANCZOS)
+    # grayscale + autocontrast
+    pil_img = pil_img.convert('L')
+    pil_img = ImageOps.autocontrast(pil_img)
+    # adaptive threshold based on mean
+    mean = int(ImageStat.Stat(pil_img).mean[0])
+    # threshold slightly below mean to keep faint text
+    thresh = int(os.getenv('OCR_THRESHOLD', str(max(60, mean - 10))))
+    # a 256-entry lookup table is applied in C; a lambda is called per pixel value
+    return pil_img.point(_threshold_lut(thresh))
+
+
+def _threshold_lut(thresh: int) -> list[int]:
+    return [255 if v > thresh else 0 for v in range(256)]
+
+
+def ocr_image_to_string(pil_img: Image.Image) -> str:
+    """OCR an image with a shared libtesseract handle, or pytesseract if tesserocr is missing."""
+    global _TESS_API
+    if _HAS_TESSEROCR:
+        with _TESS_LOCK:
+            if _TESS_API is None:
+                _TESS_API = PyTessBaseAPI()
+            _TESS_API.SetImage(pil_img)
+            return _TESS_API.GetUTF8Text().strip()
+    from pytesseract import image_to_string
+    return image_to_string(pil_img).strip()
+
+
 # -------------------- Image Download --------------------
 def download_image(img_url: str, folder: str) -> str | None:
     try:
@@ -221,7 +283,7 @@ def extract_html_captions(url: str):
 
             # JS redirect pattern (very simple): location.replace or location.href in inline scripts near top
             top_scripts = ' '.join([s.get_text(' ', strip=True) or '' for s in soup_obj.find_all('script', limit=6)])
-            if re.search(r"location\.href\s*=|location\.replace\(|window\.location", top_scripts, re.IGNORECASE):
+            if _RE_JS_REDIRECT.search(top_scripts):
                 return True, 'js-redirect'
 
             # redirect chain
@@ -327,7 +389,7 @@ def extract_html_captions(url: str):
         # inline style background-images
         for el in soup.find_all(style=True):
             style = el['style']
-            m = re.search(r'url\(([^)]+)\)', style)
+            m = _RE_CSS_URL.search(style)
             if m:
                 raw = m.group(1).strip('"\'')
                 u = urljoin(url, raw)
@@ -340,14 +402,14 @@ def extract_html_captions(url: str):
             if not text:
                 continue
             # quick url regex
-            for match in re.findall(r'https?://[^\s\"\'>)]+', text):
+            for match in _RE_HTTP_URL.findall(text):
                 if 'wp-content/uploads' in match or match.lower().endswith(('.jpg', '.jpeg', '.png', '.webp')):
                     u = match
                     if u not in seen:
                         seen.append(u)
 
         # fallback: raw html search for wp-content/uploads
-        for m in re.findall(r'https?://[^\s\"\'>)]+wp-content/uploads[^\s\"\'>)]+', html_text):
+        for m in _RE_WP_UPLOAD_URL.findall(html_text):
             u = m
             if u not in seen:
                 seen.append(u)
@@ -516,7 +578,6 @@ def extract_ocr_captions(url: str):
     if not OCR_AVAILABLE:
         return []
 
-    from pytesseract import image_to_string
     results = []
 
     WATCHDOG_SECONDS = int(os.getenv("OCR_WATCHDOG_SECONDS", "70"))
@@ -525,9 +586,13 @@ def extract_ocr_captions(url: str):
     def _watchdog(signum, frame):
         raise TimeoutError("OCR watchdog timeout")
 
+    # SIGALRM can only be installed from the main thread; worker threads
+    # (parallel per-URL runs) rely on the Playwright timeouts instead.
+    use_alarm = threading.current_thread() is threading.main_thread()
     try:
-        signal.signal(signal.SIGALRM, _watchdog)
-        signal.alarm(WATCHDOG_SECONDS)
+        if use_alarm:
+            signal.signal(signal.SIGALRM, _watchdog)
+            signal.alarm(WATCHDOG_SECONDS)
 
         with sync_playwright() as p:
             # launch with a few stealthy args
@@ -649,7 +714,7 @@ def extract_ocr_captions(url: str):
                             cand.add(urljoin(url, v))
                     # inline styles
                     for el in bs.find_all(style=True):
-                        m = re.search(r'url\(([^)]+)\)', el['style'])
+                        m = _RE_CSS_URL.search(el['style'])
                         if m:
                             raw = m.group(1).strip('"\'')
                             cand.add(urljoin(url, raw))
@@ -801,31 +866,13 @@ def extract_ocr_captions(url: str):
                         # optional preprocessing to improve OCR
                         if OCR_PREPROCESS:
                             try:
-                                def preprocess_image(pil_img: Image.Image) -> Image.Image:
-                                    # ensure RGB then scale up if small
-                                    pil_img = pil_img.convert('RGB')
-                                    maxw = int(os.getenv('OCR_MAX_WIDTH', '1200'))
-                                    if pil_img.width < maxw:
-                                        ratio = maxw / pil_img.width
-                                        nw = maxw
-                                        nh = int(pil_img.height * ratio)
-                                        pil_img = pil_img.resize((nw, nh), Image.LANCZOS)
-                                    # grayscale + autocontrast
-                                    pil_img = pil_img.convert('L')
-                                    pil_img = ImageOps.autocontrast(pil_img)
-                                    # adaptive threshold based on mean
-                                    mean = int(ImageStat.Stat(pil_img).mean[0])
-                                    # threshold slightly below mean to keep faint text
-                                    thresh = int(os.getenv('OCR_THRESHOLD', str(max(60, mean - 10))))
-                                    bw = pil_img.point(lambda p: 255 if p > thresh else 0)
-                                    return bw
                                 proc = preprocess_image(img)
-                                text = image_to_string(proc).strip()
+                                text = ocr_image_to_string(proc)
                             except Exception:
                                 # fallback to raw OCR
-                                text = image_to_string(img).strip()
+                                text = ocr_image_to_string(img)
                         else:
-                            text = image_to_string(img).strip()
+                            text = ocr_image_to_string(img)
                     except Exception:
                         text = ''
                     if text:
@@ -871,7 +918,8 @@ def extract_ocr_captions(url: str):
         print(f"[WARN] OCR fallback failed entirely: {e}")
     finally:
         try:
-            signal.alarm(0)
+            if use_alarm:
+                signal.alarm(0)
         except Exception:
             pass
 
@@ -916,11 +964,11 @@ def extract_and_save(url: str, base_output="artifacts", run_ocr: bool = True, do
         score = 0
         if caption:
             score += 5
-            if re.search(r"(rescue|helicopter|avalanche|mountain|peak|ridge|summit|snow|glacier|teams|SAR|cliff|fatal|missing)", caption, re.IGNORECASE):
+            if _RE_RELEVANT_CAPTION.search(caption):
                 score += 10
-        if re.search(r"/(wp-content|uploads|media|images)/", img_url, re.IGNORECASE):
+        if _RE_UPLOAD_PATH.search(img_url):
             score += 5
-        if re.search(r"\.(jpg|jpeg|png|webp)$", img_url, re.IGNORECASE):
+        if _RE_IMAGE_EXT.search(img_url):
             score += 5
 
         r["_score"] = score
@@ -944,8 +992,6 @@ def extract_and_save(url: str, base_output="artifacts", run_ocr: bool = True, do
     # Additional pre-download heuristics to avoid fetching landing/ad images:
     # - prefer same-origin images or images under common upload paths
     # - skip external images without caption unless they're from trusted upload paths
-    MIN_IMG_BYTES = int(os.getenv('MIN_IMG_BYTES', '4096'))
-
     def _head_checks(img_url: str) -> bool:
         """Return True if HEAD indicates this is worth downloading (image content-type and sufficient size)."""
         try:
@@ -970,7 +1016,7 @@ def extract_and_save(url: str, base_output="artifacts", run_ocr: bool = True, do
         img_host = parsed_img.netloc.replace('www.', '')
         same_origin = (img_host == article_domain)
         # preferred if in uploads/wp-content or same-origin
-        if same_origin or re.search(r"/(wp-content|uploads|media|images)/", parsed_img.path, re.IGNORECASE):
+        if same_origin or _RE_UPLOAD_PATH.search(parsed_img.path):
             if _head_checks(img_url):
                 filtered_for_download.append(r)
             else:
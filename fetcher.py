@@ -7,9 +7,13 @@ other modules can reuse it and `accident_info.py` becomes smaller.
 """
 import os
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import requests
 from bs4 import BeautifulSoup
-from typing import Tuple
+import lxml.html
+from lxml import etree
+from typing import List, Tuple
 from urllib.parse import urljoin
 import logging
 
@@ -21,6 +25,31 @@ except Exception:
 
 PLAYWRIGHT_STEALTH = os.getenv("PLAYWRIGHT_STEALTH", "true").lower() in ("1", "true", "yes")
 PLAYWRIGHT_HEADLESS = os.getenv("PLAYWRIGHT_HEADLESS", "true").lower() in ("1", "true", "yes")
+# Max concurrent Playwright browsers when extract_many runs URLs in parallel
+PLAYWRIGHT_CONCURRENCY = max(1, int(os.getenv("PLAYWRIGHT_CONCURRENCY", "4")))
+_PLAYWRIGHT_SLOTS = threading.BoundedSemaphore(PLAYWRIGHT_CONCURRENCY)
+
+# Playwright fallback payloads, built once and reused for every blocked URL
+_LAUNCH_ARGS = ['--no-sandbox', '--disable-blink-features=AutomationControlled']
+_CONTEXT_OPTS = {
+    'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120 Safari/537.36',
+    'viewport': {'width': 1200, 'height': 800},
+    'locale': 'en-US',
+    'timezone_id': os.getenv('TIMEZONE_ID', 'America/Los_Angeles'),
+}
+_STEALTH_JS = (
+    "() => {"
+    " Object.defineProperty(navigator, 'webdriver', {get: () => false});"
+    " Object.defineProperty(navigator, 'languages', {get: () => ['en-US','en']});"
+    " Object.defineProperty(navigator, 'plugins', {get: () => [1,2,3]});"
+    " }"
+)
+_SCROLL_JS = (
+    "async () => { const delay=(ms)=>new Promise(r=>setTimeout(r,ms));"
+    " for(let y=0;y<document.body.scrollHeight;y+=window.innerHeight){ window.scrollTo(0,y); await delay(200);}"
+    " await delay(300);}"
+)
+_BODY_TEXT_LEN_JS = "() => document.body && document.body.innerText ? document.body.innerText.length : 0"
 
 # module logger
 logger = logging.getLogger(__name__)
@@ -31,8 +60,33 @@ except Exception:
     pass
 
 
+_WS_RE = re.compile(r"\s+")
+
+# Block filters and patterns used by extract_article_text, built once at import.
+_BOILER_TOKENS = (
+    'subscribe now', 'sign in', 'create an account', 'unlimited online access',
+    'get exclusive access', 'support local journalists', 'daily puzzles', 'share this story',
+    'advertisement'
+)
+_STOP_TOKENS = ('enjoy insights', 'access articles from across canada', 'share your thoughts', 'join the conversation')
+_STOP_PREFIXES = ('related:', 'you might also like', 'more on', 'from our partners')
+_CLEAN_TOKENS = ('enjoy insights', 'access articles from across canada', 'share your thoughts')
+_SUBSTANTIVE_TOKENS = ('coroners', 'investigation', 'harness', 'leash', 'recovery', 'recovered', 'found', 'fell', 'died', 'death')
+# substring match (no word boundaries) over lowercased text, same as `tok in text`
+_SUBSTANTIVE_RE = re.compile('|'.join(map(re.escape, _SUBSTANTIVE_TOKENS)))
+
+_BYLINE_RE = re.compile(r'^(author\b|by\s+[A-Z][\w\-\']+)')
+_HEADLINE_RE = re.compile(r"^[A-Z][\w\s'’:-]+$")
+_SIGNUP_RE = re.compile(r"By signing up[\s\S]*?(?=\n\n|$)", re.IGNORECASE)
+_MULTI_NL_RE = re.compile(r"\n{3,}")
+_EMAIL_RE = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}")
+_ANCHOR_RE = re.compile(r"\b(slackline|fell|died|death|fatal|RCMP|Coroners|recovery|recover)\b", re.IGNORECASE)
+# Minimum static body length for anchor hits to count as a successful fetch
+_STATIC_SIGNAL_MIN_CHARS = 800
+
+
 def _clean_text_blocks(txt: str) -> str:
-    return re.sub(r"\s+", " ", txt).strip()
+    return _WS_RE.sub(" ", txt).strip()
 
 
 # Optional readability fallback
@@ -69,6 +123,80 @@ def _extract_text_via_readability(html: str) -> Tuple[str, str]:
         return "", ""
 
 
+# The extraction hot path works on lxml trees directly: traversal and text
+# collection stay in C instead of going through BeautifulSoup Tag wrappers.
+_HTML_PARSER = lxml.html.HTMLParser(encoding='utf-8')
+
+
+def _has_token(attr: str, value: str) -> str:
+    """XPath predicate matching a whitespace-separated attribute token (CSS ``.cls`` semantics)."""
+    return f"contains(concat(' ', normalize-space(@{attr}), ' '), ' {value} ')"
+
+
+# Preferred article containers, tried in order (first selector that matches wins)
+_CONTAINER_XPATHS = [
+    etree.XPath(xp) for xp in (
+        "(//article)[1]",
+        f"(//div[{_has_token('class', 'entry-content')}])[1]",
+        f"(//div[{_has_token('class', 'post-content')}])[1]",
+        "(//main)[1]",
+        "(//div[@id='content'])[1]",
+        f"(//div[{_has_token('class', 'content')}])[1]",
+    )
+]
+_AMP_HREF_XPATH = etree.XPath(f"//link[{_has_token('rel', 'amphtml')}]/@href")
+_CONTAINER_TAGS = ('article', 'section', 'div')
+
+
+def _parse_html(html: str):
+    """Parse HTML into an lxml tree with script/style removed.
+
+    Always returns a document root, even for empty or unparsable input.
+    """
+    try:
+        root = lxml.html.document_fromstring((html or '').encode('utf-8', 'replace'), parser=_HTML_PARSER)
+    except (etree.ParserError, ValueError):
+        root = lxml.html.document_fromstring('<html><body></body></html>')
+    etree.strip_elements(root, 'script', 'style', with_tail=False)
+    return root
+
+
+def _node_text(el) -> str:
+    """Equivalent of BeautifulSoup's ``get_text(' ', strip=True)`` for lxml."""
+    return ' '.join(t.strip() for t in el.itertext() if t.strip())
+
+
+def _body_or_root(root):
+    body = root.find('body')
+    return body if body is not None else root
+
+
+def _best_text_container(root):
+    """Return the article/section/div holding the most paragraph text, or None.
+
+    Each <p> is measured once and its length credited to every enclosing
+    container, instead of re-walking every container's subtree (quadratic on
+    div-heavy pages). Ties keep the first container in document order.
+    """
+    totals = {}
+    for p in root.iter('p'):
+        n = len(_node_text(p))
+        if not n:
+            continue
+        for anc in p.iterancestors(*_CONTAINER_TAGS):
+            totals[anc] = totals.get(anc, 0) + n
+    if not totals:
+        return None
+    best = None
+    best_len = 0
+    for el in root.iter(*_CONTAINER_TAGS):
+        total = totals.get(el, 0)
+        if total > best_len:
+            best_len = total
+            best = el
+    return best if best_len > 200 else None
+
+
 def extract_article_text(url: str, timeout: int = 25) -> Tuple[str, str, str]:
     """Return (full_text, focused_text, final_url).
 
@@ -94,8 +222,9 @@ def extract_article_text(url: str, timeout: int = 25) -> Tuple[str, str, str]:
         logger.warning(f"Failed to fetch article HTML for {url}: {e}")
         return "", "", url
 
-    soup = BeautifulSoup(html, "html.parser")
-    body_text = ' '.join([t.strip() for t in soup.stripped_strings])
+    page_html = html
+    root = _parse_html(html)
+    body_text = _node_text(root)
 
     # Try AMP endpoint if linked or simple variants appear useful, before resorting to Playwright
     try:
@@ -107,9 +236,9 @@ def extract_article_text(url: str, timeout: int = 25) -> Tuple[str, str, str]:
         )
         if blocked_or_short:
             amp_link = None
-            link_tag = soup.find('link', rel=lambda v: v and 'amphtml' in v)
-            if link_tag and link_tag.get('href'):
-                amp_link = urljoin(final_url, link_tag['href'])
+            amp_hrefs = _AMP_HREF_XPATH(root)
+            if amp_hrefs and amp_hrefs[0]:
+                amp_link = urljoin(final_url, amp_hrefs[0])
             # If no amphtml link, try common patterns conservatively
             candidate_urls = []
             if not amp_link:
@@ -125,8 +254,9 @@ def extract_article_text(url: str, timeout: int = 25) -> Tuple[str, str, str]:
                 try:
                     r2 = requests.get(cu, headers=headers, timeout=timeout)
                     if r2.ok and r2.text and len(r2.text) > len(html):
-                        soup = BeautifulSoup(r2.text, 'html.parser')
-                        body_text = ' '.join([t.strip() for t in soup.stripped_strings])
+                        page_html = r2.text
+                        root = _parse_html(page_html)
+                        body_text = _node_text(root)
                         final_url = getattr(r2, 'url', final_url) or final_url
                         break
                 except Exception:
@@ -134,46 +264,52 @@ def extract_article_text(url: str, timeout: int = 25) -> Tuple[str, str, str]:
     except Exception:
         pass
 
-    if (resp is not None and getattr(resp, 'status_code', None) == 403) or len(body_text) < 100 or 'access denied' in body_text.lower() or '403 forbidden' in body_text.lower():
+    # A static page that already reads like an incident report rendered fine;
+    # don't pay for a browser launch just because of a 403 status or a stray
+    # "access denied" string elsewhere on the page.
+    body_has_signal = len(body_text) >= _STATIC_SIGNAL_MIN_CHARS and bool(_ANCHOR_RE.search(body_text))
+    body_lower = body_text.lower()
+    looks_blocked = (
+        (resp is not None and getattr(resp, 'status_code', None) == 403)
+        or len(body_text) < 100
+        or 'access denied' in body_lower
+        or '403 forbidden' in body_lower
+    )
+    if looks_blocked and not body_has_signal:
         try:
             from playwright.sync_api import sync_playwright
             logger.info(f"Static fetch appears blocked (status={getattr(resp,'status_code',None)}). Falling back to Playwright for {url}")
-            with sync_playwright() as p:
-                browser = p.chromium.launch(headless=PLAYWRIGHT_HEADLESS, args=['--no-sandbox', '--disable-blink-features=AutomationControlled'])
-                context = browser.new_context(user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120 Safari/537.36', viewport={'width':1200,'height':800}, extra_http_headers={'referer': url}, locale='en-US', timezone_id=os.getenv('TIMEZONE_ID', 'America/Los_Angeles'))
+            with _PLAYWRIGHT_SLOTS, sync_playwright() as p:
+                browser = p.chromium.launch(headless=PLAYWRIGHT_HEADLESS, args=_LAUNCH_ARGS)
+                context = browser.new_context(**_CONTEXT_OPTS, extra_http_headers={'referer': url})
                 try:
                     if PLAYWRIGHT_STEALTH:
-                        context.add_init_script(
-                            "() => {"
-                            " Object.defineProperty(navigator, 'webdriver', {get: () => false});"
-                            " Object.defineProperty(navigator, 'languages', {get: () => ['en-US','en']});"
-                            " Object.defineProperty(navigator, 'plugins', {get: () => [1,2,3]});"
-                            " }"
-                        )
+                        context.add_init_script(_STEALTH_JS)
                 except Exception:
                     pass
                 page = context.new_page()
-                page.set_default_navigation_timeout(int(os.getenv('PLAYWRIGHT_NAV_TIMEOUT_MS','60000')))
+                nav_timeout = int(os.getenv('PLAYWRIGHT_NAV_TIMEOUT_MS', '60000'))
+                page.set_default_navigation_timeout(nav_timeout)
                 try:
-                    page.goto(url, timeout=int(os.getenv('PLAYWRIGHT_NAV_TIMEOUT_MS','60000')), wait_until='domcontentloaded')
+                    page.goto(url, timeout=nav_timeout, wait_until='domcontentloaded')
                     try:
-                        page.wait_for_load_state('networkidle', timeout=int(os.getenv('PLAYWRIGHT_NAV_TIMEOUT_MS','60000')))
+                        page.wait_for_load_state('networkidle', timeout=nav_timeout)
                     except Exception:
                         pass
                 except Exception as e:
                     logger.warning(f"Playwright navigation failed: {e}")
                     browser.close()
-                    soup = BeautifulSoup(html, 'html.parser')
-                    return _clean_text_blocks(' '.join([t.strip() for t in soup.stripped_strings])), _clean_text_blocks(' '.join([t.strip() for t in soup.stripped_strings])), url
+                    static_text = _clean_text_blocks(_node_text(_parse_html(html)))
+                    return static_text, static_text, url
 
                 try:
-                    page.evaluate("async () => { const delay=(ms)=>new Promise(r=>setTimeout(r,ms)); for(let y=0;y<document.body.scrollHeight;y+=window.innerHeight){ window.scrollTo(0,y); await delay(200);} await delay(300);}")
+                    page.evaluate(_SCROLL_JS)
                 except Exception:
                     pass
                 # Wait briefly for content growth if body text looks tiny
                 try:
                     for _ in range(5):
-                        txt_len = page.evaluate("() => document.body && document.body.innerText ? document.body.innerText.length : 0")
+                        txt_len = page.evaluate(_BODY_TEXT_LEN_JS)
                         if txt_len and txt_len > 2000:
                             break
                         page.wait_for_timeout(400)
@@ -185,106 +321,77 @@ def extract_article_text(url: str, timeout: int = 25) -> Tuple[str, str, str]:
                 except Exception:
                     pass
                 browser.close()
-                soup = BeautifulSoup(rendered, 'html.parser')
+                page_html = rendered
+                root = _parse_html(page_html)
         except Exception as e:
             logger.warning(f"Playwright fallback failed: {e}")
-            soup = BeautifulSoup(html, "html.parser")
+            page_html = html
+            root = _parse_html(page_html)
             final_url = getattr(resp, 'url', url) or url
 
     # prefer article containers
-    candidates = []
-    for sel in [
-        "article",
-        "div.entry-content",
-        "div.post-content",
-        "main",
-        "div#content",
-        "div.content",
-    ]:
-        node = soup.select_one(sel)
-        if node:
-            candidates.append(node)
-
-    node = candidates[0] if candidates else None
+    node = None
+    for xp in _CONTAINER_XPATHS:
+        found = xp(root)
+        if found:
+            node = found[0]
+            break
     if node is None:
-        best = None
-        best_len = 0
-        for el in soup.find_all(['article', 'section', 'div']):
-            ps = el.find_all('p')
-            total = sum(len(p.get_text(' ', strip=True) or '') for p in ps)
-            if total > best_len:
-                best_len = total
-                best = el
-        if best is not None and best_len > 200:
-            node = best
-        else:
-            node = soup.body or soup
+        node = _best_text_container(root)
+    if node is None:
+        node = _body_or_root(root)
 
     blocks = []
+    lowered = []  # blocks[i].lower(), computed once and reused by every pass below
     title = None
-    for h in node.find_all(['h1', 'h2']):
-        t = h.get_text(' ', strip=True)
+    for h in node.iter('h1', 'h2'):
+        t = _node_text(h)
         if t and len(t) > 10:
             title = t
             break
 
-    BOILER_TOKENS = [
-        'subscribe now', 'sign in', 'create an account', 'unlimited online access',
-        'get exclusive access', 'support local journalists', 'daily puzzles', 'share this story',
-        'advertisement'
-    ]
-
     seen_blocks = set()
-    for el in node.find_all(["p", "h1", "h2", "h3", "li"]):
-        t = el.get_text(" ", strip=True)
+    for el in node.iter('p', 'h1', 'h2', 'h3', 'li'):
+        t = _node_text(el)
         if not t or len(t) < 30:
             continue
         tl = t.lower()
         if tl.startswith('conversation') or tl.startswith('comments') or 'comment by' in tl:
             break
-        skip = False
-        for token in BOILER_TOKENS:
-            if token in tl:
-                skip = True
-                break
-        if skip:
+        if any(token in tl for token in _BOILER_TOKENS):
             continue
         if t in seen_blocks:
             continue
         seen_blocks.add(t)
         blocks.append(t)
+        lowered.append(tl)
 
     if not title:
-        for h in soup.find_all(['h1', 'h2']):
-            t = h.get_text(' ', strip=True)
+        for h in root.iter('h1', 'h2'):
+            t = _node_text(h)
             if t and len(t) > 10:
                 title = t
                 break
 
-    STOP_TOKENS = ['enjoy insights', 'access articles from across canada', 'share your thoughts', 'join the conversation']
-    STOP_PREFIXES = ['related:', 'you might also like', 'more on', 'from our partners']
-
+    # Single pass over the blocks: filter boilerplate into full_blocks while
+    # recording the last substantive kept block and the first anchor block.
     full_blocks = []
-    for b in blocks:
-        bl = b.lower()
-        if re.match(r'^(author\b|by\s+[A-Z][\w\-\']+)', b.strip()):
-            full_blocks.append(b)
-            continue
-        if any(bl.startswith(pfx) for pfx in STOP_PREFIXES):
-            continue
-        if any(tok in bl for tok in STOP_TOKENS):
-            continue
-        if len(b.strip()) < 30:
-            if not (len(b.strip()) >= 30 or re.match(r'^[A-Z][\w\s\'’:-]+$', b.strip())):
+    last_idx = None
+    anchor_idx = None
+    for i, (b, bl) in enumerate(zip(blocks, lowered)):
+        if anchor_idx is None and _ANCHOR_RE.search(b):
+            anchor_idx = i
+        if not _BYLINE_RE.match(b.strip()):
+            if bl.startswith(_STOP_PREFIXES):
                 continue
+            if any(tok in bl for tok in _STOP_TOKENS):
+                continue
+            if len(b.strip()) < 30:
+                if not (len(b.strip()) >= 30 or _HEADLINE_RE.match(b.strip())):
+                    continue
         full_blocks.append(b)
-
-    substantive_tokens = ['coroners', 'investigation', 'harness', 'leash', 'recovery', 'recovered', 'found', 'fell', 'died', 'death']
-    last_idx = None
-    for i, b in enumerate(full_blocks):
-        bl = b.lower()
-        if any(tok in bl for tok in substantive_tokens):
-            last_idx = i
+        if _SUBSTANTIVE_RE.search(bl):
+            last_idx = len(full_blocks) - 1
     if last_idx is not None:
         full_blocks = full_blocks[: last_idx + 1]
 
@@ -293,27 +400,25 @@ def extract_article_text(url: str, timeout: int = 25) -> Tuple[str, str, str]:
         para_blocks.append(title.strip())
     para_blocks.extend([b.strip() for b in full_blocks if b and b.strip()])
     full_text = "\n\n".join(para_blocks)
-    full_text = re.sub(r"By signing up[\s\S]*?(?=\n\n|$)", "", full_text, flags=re.IGNORECASE)
-    full_text = re.sub(r"\n{3,}", "\n\n", full_text)
+    full_text = _SIGNUP_RE.sub("", full_text)
+    full_text = _MULTI_NL_RE.sub("\n\n", full_text)
 
-    email_m = re.search(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}", full_text)
+    email_m = _EMAIL_RE.search(full_text)
     if email_m:
         full_text = full_text[: email_m.end()].strip()
-    else:
-        paras = [p.strip() for p in full_text.split('\n\n') if p.strip()]
+    paras = [p.strip() for p in full_text.split('\n\n') if p.strip()]
+    if not email_m:
         last_para_idx = None
         for i, p in enumerate(paras):
-            pl = p.lower()
-            if any(tok in pl for tok in substantive_tokens):
+            if _SUBSTANTIVE_RE.search(p.lower()):
                 last_para_idx = i
         if last_para_idx is not None:
             paras = paras[: last_para_idx + 1]
-            full_text = '\n\n'.join(paras)
 
-    paras = [p.strip() for p in full_text.split('\n\n') if p.strip()]
+    # drop a trailing run of short (<= 12 word) paragraphs: bylines, captions, links
     tail_run = 0
     for p in reversed(paras):
-        if len(re.findall(r"\w+", p)) <= 12:
+        if len(p.split()) <= 12:
             tail_run += 1
         else:
             break
@@ -321,26 +426,17 @@ def extract_article_text(url: str, timeout: int = 25) -> Tuple[str, str, str]:
         paras = paras[:-tail_run]
     full_text = '\n\n'.join(paras)
 
-    anchor_regex = re.compile(r"\b(slackline|fell|died|death|fatal|RCMP|Coroners|recovery|recover)\b", re.IGNORECASE)
-    anchor_idx = None
-    for i, b in enumerate(blocks):
-        if anchor_regex.search(b):
-            anchor_idx = i
-            break
     if anchor_idx is not None:
         start = max(0, anchor_idx - 1)
         end = min(len(blocks), anchor_idx + 6)
-        focused = blocks[start:end]
     else:
-        focused = blocks
+        start, end = 0, len(blocks)
 
-    CLEAN_TOKENS = ['enjoy insights', 'access articles from across canada', 'share your thoughts']
     final = []
-    for b in focused:
-        bl = b.lower()
-        if any(tok in bl for tok in CLEAN_TOKENS):
+    for b, bl in zip(blocks[start:end], lowered[start:end]):
+        if any(tok in bl for tok in _CLEAN_TOKENS):
             continue
-        if len(b) < 60 and re.match(r"^[A-Z][\w\s'’:-]+$", b) and ' ' in b:
+        if len(b) < 60 and _HEADLINE_RE.match(b) and ' ' in b:
             continue
         final.append(b)
 
@@ -351,10 +447,34 @@ def extract_article_text(url: str, timeout: int = 25) -> Tuple[str, str, str]:
     # Readability fallback if content still looks very short (generic heuristic)
     try:
         if len(full_text) < 800:
-            fr, ff = _extract_text_via_readability(str(soup))
+            fr, ff = _extract_text_via_readability(page_html)
             if fr and len(fr) > len(full_text):
                 full_text, focused_text = fr, ff
     except Exception:
         pass
 
     return full_text, focused_text, final_url
+
+
+def extract_many(urls: List[str], max_workers: int = 8, extract=None) -> list:
+    """Run `extract_article_text` over `urls` concurrently; results keep input order.
+
+    Fetching is network-bound, so a thread pool overlaps the waits. Playwright
+    fallbacks are additionally capped at PLAYWRIGHT_CONCURRENCY browsers.
+    A URL that raises yields ("", "", url) instead of failing the batch.
+    `extract` overrides the per-URL function (callers pass their own patched hook).
+    """
+    urls = list(urls)
+    if not urls:
+        return []
+    fn = extract or extract_article_text
+
+    def _one(u: str):
+        try:
+            return fn(u)
+        except Exception as e:
+            logger.warning(f"Article extraction failed for {u}: {e}")
+            return "", "", u
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(urls)))) as ex:
+        return list(ex.map(_one, urls))
@@ -8,24 +8,38 @@ requested JSON structure. It does not use local OCR or correlation heuristics.
 Public functions:
  - analyze_conditions(image_path: str) -> dict
  - enrich_json_with_conditions(json_path: str) -> None
+ - enrich_json_with_conditions_batch(json_path: str) -> None
 """
 
 from __future__ import annotations
+import hashlib
+import io
 import os
-import json
-import base64
-import re
+import binascii
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from typing import Any, Dict
+from urllib.parse import quote
 
-from openai import OpenAI
+from openai import OpenAI, RateLimitError
+from PIL import Image, ImageOps
 from config import SERVICE_TIER
 try:
-    # Auto-load .env so OPENAI_API_KEY is picked up without manual export
-    from dotenv import load_dotenv
-    load_dotenv()
+    # SIMD base64 encoder; binascii is the fallback
+    import pybase64  # type: ignore
+    _b64encode = pybase64.b64encode
 except Exception:
-    pass
+    def _b64encode(chunk: bytes) -> bytes:
+        return binascii.b2a_base64(chunk, newline=False)
+try:
+    # Header-only dimension probe; PIL is the fallback
+    import imagesize  # type: ignore
+    _HAS_IMAGESIZE = True
+except Exception:
+    imagesize = None  # type: ignore
+    _HAS_IMAGESIZE = False
 try:
     # Auto-load .env if present so OPENAI_API_KEY is available without manual export
     from dotenv import load_dotenv
@@ -33,186 +47,1147 @@ try:
 except Exception:
     pass
 from config import OCR_VISION_MODEL
-from openai_call_manager import can_make_call, record_call
+from openai_call_manager import release, remaining, try_reserve
+from rate_limiter import TokenEstimator, limiter
+from json_utils import dumps_bytes, loads, read_json, write_json
+from extract_captions import MIN_IMG_BYTES, MIN_IMG_WIDTH, MIN_IMG_HEIGHT, contains_irrelevant_token
 
+# Max concurrent vision requests in enrich_json_with_conditions (network-bound)
+OCR_CONCURRENCY = max(1, int(os.getenv('OCR_CONCURRENCY', '8')))
+# Images sent together in one vision request by enrich_json_with_conditions.
+# >1 amortizes per-request overhead and RPM quota; replies that do not parse
+# into one result per image fall back to one call per image.
+OCR_IMAGES_PER_CALL = max(1, int(os.getenv('OCR_IMAGES_PER_CALL', '1')))
 
-def _encode_image_as_data_url(image_path: str) -> str:
-    with open(image_path, 'rb') as f:
-        b64 = base64.b64encode(f.read()).decode('utf-8')
+# Vision payload sizing. The API downsamples large images server-side anyway,
+# so full-resolution uploads only add bytes, latency and image tokens.
+OCR_MAX_EDGE = int(os.getenv('OCR_MAX_EDGE', '1024'))
+# detail='low' images are seen by the model at 512x512 at most
+_LOW_DETAIL_EDGE = 512
+OCR_JPEG_QUALITY = int(os.getenv('OCR_JPEG_QUALITY', '80'))
+# Format for re-encoded (downscaled/converted) images: 'webp' is typically
+# ~30% smaller than JPEG at the same quality; 'jpeg' is also the fallback
+# when the WebP encoder is unavailable. OCR_JPEG_QUALITY applies to both.
+OCR_RECODE_FORMAT = os.getenv('OCR_RECODE_FORMAT', 'webp').lower()
+# image_url detail hint: 'low' | 'high' | 'auto' | 'adaptive'. 'adaptive' sends
+# images whose (downscaled) area is under OCR_DETAIL_AREA with 'low' and the
+# rest with 'high'.
+OCR_IMAGE_DETAIL = os.getenv('OCR_IMAGE_DETAIL', 'low')
+OCR_DETAIL_AREA = int(os.getenv('OCR_DETAIL_AREA', str(800 * 600)))
+_API_IMAGE_EXTS = ('jpg', 'jpeg', 'png', 'webp')
+# When the image directory is served over HTTPS (reachable by OpenAI), send
+# f"{OCR_IMAGE_URL_BASE}/<path relative to OCR_IMAGE_ROOT>" instead of a
+# base64 data URL: no local encode and a ~33% smaller request body. Images
+# outside OCR_IMAGE_ROOT or in formats the API does not accept still go inline.
+OCR_IMAGE_URL_BASE = os.getenv('OCR_IMAGE_URL_BASE', '').rstrip('/')
+OCR_IMAGE_ROOT = os.getenv('OCR_IMAGE_ROOT', '.')
+_B64_CHUNK = 57 * 1024
+
+# Content-addressed cache of model results: identical image bytes analysed with
+# the same model/prompt/payload settings are never sent twice. Bump
+# _PROMPT_VERSION whenever the prompt or output schema changes.
+_PROMPT_VERSION = '4'
+OCR_CACHE_DIR = Path(os.getenv('OCR_CACHE_DIR', str(Path(__file__).parent / '.ocr_cache')))
+OCR_CACHE_ENABLED = os.getenv('OCR_CACHE', 'true').lower() in ('1', 'true', 'yes')
+
+# Ask the API to enforce the output schema (structured outputs). Disable for
+# models that do not support response_format=json_schema.
+OCR_STRICT_SCHEMA = os.getenv('OCR_STRICT_SCHEMA', 'true').lower() in ('1', 'true', 'yes')
+
+# Re-analyse entries that already hold a result (OCR_FORCE_REDO=1 or
+# `main.py --ocr-force`); by default they are skipped.
+OCR_FORCE_REDO = os.getenv('OCR_FORCE_REDO', '0').lower() in ('1', 'true', 'yes')
+
+# Pre-screen images before any API call (decorative assets, tiny/broken files).
+OCR_SCREEN_IMAGES = os.getenv('OCR_SCREEN_IMAGES', 'true').lower() in ('1', 'true', 'yes')
+# Screening is stat + header decode per file: I/O bound, so oversubscribe threads.
+OCR_SCREEN_WORKERS = max(1, int(os.getenv('OCR_SCREEN_WORKERS', str((os.cpu_count() or 1) * 4))))
+
+# Offline enrichment via the Batch API (half price, separate rate-limit pool,
+# results within the 24h completion window). Opt-in: OCR_USE_BATCH=1 (or
+# OCR_BATCH=1), or `main.py --ocr-batch`.
+OCR_USE_BATCH = os.getenv('OCR_USE_BATCH', os.getenv('OCR_BATCH', '0')).lower() in ('1', 'true', 'yes')
+OCR_BATCH_POLL_SECONDS = float(os.getenv('OCR_BATCH_POLL_SECONDS', '30'))
+_BATCH_TERMINAL = ('completed', 'failed', 'expired', 'cancelled')
+
+
+def _bytes_digest(raw: bytes) -> str:
+    return hashlib.blake2b(raw, digest_size=20).hexdigest()
+
+
+def _cache_key(image_digest: str, model: str, detail: str = OCR_IMAGE_DETAIL) -> str:
+    settings = (
+        f"{model}|{_PROMPT_VERSION}|{OCR_MAX_EDGE}|{OCR_JPEG_QUALITY}|{OCR_RECODE_FORMAT}"
+        f"|{detail}|{int(OCR_STRICT_SCHEMA)}"
+    )
+    return hashlib.blake2b(f"{image_digest}|{settings}".encode('utf-8'), digest_size=20).hexdigest()
+
+
+def _cache_get(key: str) -> Dict[str, Any] | None:
+    if not OCR_CACHE_ENABLED:
+        return None
+    try:
+        return read_json(OCR_CACHE_DIR / f"{key}.json")
+    except Exception:
+        return None
+
+
+def _cache_put(key: str, obj: Dict[str, Any]) -> None:
+    if not OCR_CACHE_ENABLED:
+        return
+    # zero-confidence replies are not worth pinning: a later run retries them
+    ocr = obj.get('ocr')
+    if not isinstance(ocr, dict) or not (ocr.get('confidence') or 0) > 0:
+        return
+    try:
+        OCR_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        # write-then-rename so concurrent workers never observe a partial file
+        tmp = OCR_CACHE_DIR / f"{key}.{os.getpid()}.{threading.get_ident()}.tmp"
+        write_json(tmp, obj)
+        os.replace(tmp, OCR_CACHE_DIR / f"{key}.json")
+    except Exception:
+        pass
+
+
+def _image_size(image_path: str | io.BytesIO) -> tuple[int, int]:
+    """(w, h) read from the file header; raises if the file is not a readable image."""
+    if _HAS_IMAGESIZE:
+        try:
+            w, h = imagesize.get(image_path)
+            if w > 0 and h > 0:
+                return w, h
+        except Exception:
+            pass
+    with Image.open(image_path) as im:
+        return im.size
+
+
+def _screen_image(
+    image_path: str,
+    caption: str | None = None,
+    st_size: int | None = None,
+    raw: bytes | None = None,
+) -> tuple[bool, tuple[int, int] | None]:
+    """Return (irrelevant, (w, h)) for an image, opening it at most once.
+
+    Only the header is read, so this is cheap; the size is handed on to the
+    encoder so it does not have to reopen small images. `st_size` is the file
+    size when the caller already has it from a directory scan, `raw` the file
+    bytes when they have already been read.
+    """
+    if contains_irrelevant_token(caption):
+        return True, None
+    try:
+        if (os.path.getsize(image_path) if st_size is None else st_size) < MIN_IMG_BYTES:
+            return True, None
+        w, h = _image_size(io.BytesIO(raw) if raw is not None else image_path)
+    except Exception:
+        return True, None
+    return (w < MIN_IMG_WIDTH or h < MIN_IMG_HEIGHT), (w, h)
+
+
+def _stat_map(paths: list[str]) -> Dict[str, os.stat_result]:
+    """Stat every file in the directories holding `paths` with one scandir each.
+
+    Keys are built the way the paths are stored (dirname + name), so lookups
+    by entry path replace a separate exists()/getsize() per image.
+    """
+    stats: Dict[str, os.stat_result] = {}
+    for d in {os.path.dirname(path) for path in paths}:
+        try:
+            with os.scandir(d or '.') as it:
+                for de in it:
+                    if de.is_file():
+                        stats[os.path.join(d, de.name)] = de.stat()
+        except OSError:
+            pass
+    return stats
+
+
+def _prepare_entry(entry: Dict[str, Any], st_size: int | None = None) -> tuple[tuple[int, int] | None, str | None] | None:
+    """Screen one entry and hash its image; None means the image is not worth analysing.
+
+    The file is opened once: the header probe and the digest share one read.
+    """
+    path = entry['local_image_path']
+    caption = entry.get('caption_clean')
+    if OCR_SCREEN_IMAGES and (
+        contains_irrelevant_token(caption) or (st_size is not None and st_size < MIN_IMG_BYTES)
+    ):
+        # rejected from the caption and directory scan alone
+        return None
+    try:
+        raw = Path(path).read_bytes()
+    except OSError:
+        return None if OCR_SCREEN_IMAGES else (None, None)
+    size = None
+    if OCR_SCREEN_IMAGES:
+        irrelevant, size = _screen_image(path, caption, len(raw), raw)
+        if irrelevant:
+            return None
+    return size, _bytes_digest(raw)
+
+
+def _already_annotated(entry: Dict[str, Any], digest: str | None = None) -> bool:
+    """True when the entry holds a real result for its current image.
+
+    Results tagged with an image_hash must match the current bytes; results
+    written before hashes were recorded are trusted as-is.
+    """
+    ocr = entry.get('ocr')
+    if OCR_FORCE_REDO or not isinstance(ocr, dict):
+        return False
+    if not ocr.get('model') or not (ocr.get('confidence') or 0) > 0:
+        return False
+    stored = ocr.get('image_hash')
+    return stored is None or (digest is not None and stored == digest)
+
+
+def _annotated_untagged(entry: Dict[str, Any]) -> bool:
+    """True for a trusted result recorded without an image_hash (non-dict `ocr` values never are)."""
+    existing = entry.get('ocr')
+    return isinstance(existing, dict) and existing.get('image_hash') is None and _already_annotated(entry)
+
+
+def _relevant_entries(data: list) -> list[tuple[int, Dict[str, Any], tuple[int, int] | None, str | None]]:
+    """Return (index, entry, size, digest) for entries whose local image should be analysed.
+
+    Screening and hashing are I/O bound, so they run on a thread pool. Entries
+    that already hold a result for their current image are skipped (see
+    _already_annotated) unless OCR_FORCE_REDO is set.
+    """
+    # untagged results are skipped before their files are even opened
+    pending = [
+        (idx, entry) for idx, entry in enumerate(data)
+        if entry.get('local_image_path') and not _annotated_untagged(entry)
+    ]
+    annotated = sum(1 for e in data if e.get('local_image_path')) - len(pending)
+    stats = _stat_map([entry['local_image_path'] for _idx, entry in pending])
+    # unusual spellings (e.g. doubled slashes) miss the map; stat those directly
+    todo = [
+        (idx, entry) for idx, entry in pending
+        if entry['local_image_path'] in stats or os.path.isfile(entry['local_image_path'])
+    ]
+    if not todo:
+        if annotated:
+            print(f"[INFO] ⏩ Skipping {annotated} images already annotated")
+        return []
+
+    def _prepare(entry: Dict[str, Any]):
+        st = stats.get(entry['local_image_path'])
+        return _prepare_entry(entry, st.st_size if st is not None else None)
+
+    with ThreadPoolExecutor(max_workers=min(OCR_SCREEN_WORKERS, len(todo))) as ex:
+        prepared = list(ex.map(_prepare, [entry for _idx, entry in todo]))
+    keep = []
+    screened = 0
+    for (idx, entry), prep in zip(todo, prepared):
+        if prep is None:
+            screened += 1
+        elif _already_annotated(entry, prep[1]):
+            annotated += 1
+        else:
+            keep.append((idx, entry, prep[0], prep[1]))
+    if screened:
+        print(f"[INFO] ⏩ Skipping {screened} irrelevant/small images before OCR")
+    if annotated:
+        print(f"[INFO] ⏩ Skipping {annotated} images already annotated")
+    return keep
+
+
+def _assign_result(entry: Dict[str, Any], result: Dict[str, Any], digest: str | None) -> None:
+    ocr = result.get('ocr')
+    if isinstance(ocr, dict) and digest:
+        ocr = {**ocr, 'image_hash': digest}
+    entry['ocr'] = ocr
+    entry['mountaineering_extras'] = result.get('mountaineering_extras')
+
+
+def _is_small(size: tuple[int, int] | None) -> bool:
+    """True when the image, after the OCR_MAX_EDGE downscale, is under OCR_DETAIL_AREA."""
+    if size is None:
+        return False
+    w, h = size
+    scale = min(1.0, OCR_MAX_EDGE / max(w, h, 1))
+    return (w * scale) * (h * scale) < OCR_DETAIL_AREA
+
+
+def _detail_for(size: tuple[int, int] | None) -> str:
+    """image_url detail level for an image of the given original size."""
+    if OCR_IMAGE_DETAIL != 'adaptive':
+        return OCR_IMAGE_DETAIL
+    if size is None:
+        return 'auto'
+    return 'low' if _is_small(size) else 'high'
+
+
+def _resolve_detail(detail: str | None, size: tuple[int, int] | None = None) -> str:
+    """A detail level the API accepts: None or 'adaptive' is resolved from the image size."""
+    if detail is None or detail == 'adaptive':
+        return _detail_for(size)
+    return detail
+
+
+def _model_for(size: tuple[int, int] | None) -> str:
+    """Vision model for an image: OCR_VISION_MODEL_SMALL (if set) for small images."""
+    small_model = os.getenv('OCR_VISION_MODEL_SMALL')
+    if small_model and _is_small(size):
+        return small_model
+    return os.getenv('OCR_VISION_MODEL', OCR_VISION_MODEL)
+
+
+def _log_buckets(sizes: list, route_models: bool = True) -> None:
+    """Log how images split across detail levels / model pools, for tuning."""
+    if not sizes:
+        return
+    if OCR_IMAGE_DETAIL == 'adaptive':
+        counts: Dict[str, int] = {}
+        for size in sizes:
+            d = _detail_for(size)
+            counts[d] = counts.get(d, 0) + 1
+        print("[INFO] OCR detail buckets: " + ", ".join(f"{k}={v}" for k, v in sorted(counts.items())))
+    if route_models and os.getenv('OCR_VISION_MODEL_SMALL'):
+        counts = {}
+        for size in sizes:
+            m = _model_for(size)
+            counts[m] = counts.get(m, 0) + 1
+        print("[INFO] OCR model pools: " + ", ".join(f"{k}={v}" for k, v in sorted(counts.items())))
+
+
+def _max_edge_for(detail: str) -> int:
+    return min(OCR_MAX_EDGE, _LOW_DETAIL_EDGE) if detail == 'low' else OCR_MAX_EDGE
+
+
+def _downscaled_image(
+    image_path: str | io.BytesIO,
+    force: bool,
+    max_edge: int | None = None,
+) -> tuple[bytes, str] | None:
+    """Return (bytes, format) with the long edge capped at `max_edge` (OCR_MAX_EDGE), or None.
+
+    The image is re-encoded as OCR_RECODE_FORMAT ('webp' or 'jpeg'). None
+    means the original file can be sent as-is (already small enough and
+    `force` not set) or that PIL cannot decode it.
+    """
+    edge = max_edge or OCR_MAX_EDGE
+    try:
+        with Image.open(image_path) as im:
+            if not force and max(im.size) <= edge:
+                return None
+            # let the JPEG decoder scale down during decode (much cheaper than a full decode)
+            im.draft('RGB', (edge, edge))
+            im = ImageOps.exif_transpose(im)
+            im.thumbnail((edge, edge), Image.LANCZOS)
+            im = im.convert('RGB')
+            if OCR_RECODE_FORMAT == 'webp':
+                try:
+                    buf = io.BytesIO()
+                    im.save(buf, 'WEBP', quality=OCR_JPEG_QUALITY, method=4)
+                    return buf.getvalue(), 'webp'
+                except Exception:
+                    pass  # PIL built without libwebp
+            buf = io.BytesIO()
+            im.save(buf, 'JPEG', quality=OCR_JPEG_QUALITY, optimize=True)
+            return buf.getvalue(), 'jpeg'
+    except Exception:
+        return None
+
+
+def _b64_stream(f, prefix: bytes = b'') -> str:
+    """Base64-encode a binary stream chunk by chunk (no full raw copy in memory).
+
+    `prefix` is emitted first, so a data URL is assembled in one buffer and
+    decoded to str once instead of being concatenated afterwards.
+    """
+    out = bytearray(prefix)
+    # every chunk but the last is exactly _B64_CHUNK (a multiple of 3) bytes,
+    # so no padding is emitted mid-stream even if a read comes back short
+    while chunk := f.read(_B64_CHUNK):
+        while len(chunk) < _B64_CHUNK and (more := f.read(_B64_CHUNK - len(chunk))):
+            chunk += more
+        out += _b64encode(chunk)
+    return out.decode('ascii')
+
+
+def _encode_image_as_data_url(
+    image_path: str,
+    size: tuple[int, int] | None = None,
+    detail: str | None = None,
+    raw: bytes | None = None,
+) -> str:
+    """Build the image data URL; `raw` (the file's bytes, if already read) avoids rereading the file."""
+    detail = _resolve_detail(detail, size)
     ext = os.path.splitext(image_path)[1].lower().lstrip('.') or 'jpeg'
-    if ext not in ('jpg', 'jpeg', 'png', 'webp'):
+    # re-encode oversized images and formats the API does not accept (gif, bmp, ...);
+    # a known size that already fits lets us skip opening the image again
+    force = ext not in _API_IMAGE_EXTS
+    edge = _max_edge_for(detail)
+    fits = size is not None and max(size) <= edge
+    source = io.BytesIO(raw) if raw is not None else image_path
+    small = None if fits and not force else _downscaled_image(source, force=force, max_edge=edge)
+    if small is not None:
+        data, fmt = small
+        return _b64_stream(io.BytesIO(data), f"data:image/{fmt};base64,".encode('ascii'))
+    if ext not in _API_IMAGE_EXTS:
         ext = 'jpeg'
-    return f"data:image/{ext};base64,{b64}"
-
-
-def _chat_vision_json(client: OpenAI, model: str, image_data_url: str) -> str:
-    prompt = (
-        "Return ONE JSON object only (no prose). Use exactly these keys and subkeys. If uncertain or not visible, use nulls. Units: include both ft/m where applicable.\n\n"
-        "{\n"
-        "  \"ocr\": {\n"
-        "    \"model\": null,\n"
-        "    \"summary\": \"short high-level description\",\n"
-        "    \"signals\": {\n"
-        "      \"avalanche_signs\": {\n"
-        "        \"crown_line\": true|false|null,\n"
-        "        \"debris\": true|false|null,\n"
-        "        \"slide_paths\": string|null,\n"
-        "        \"size_est\": \"D1\"|\"D2\"|\"D3\"|null,\n"
-        "        \"slab_type\": \"wind\"|\"persistent\"|\"storm\"|\"wet_slab\"|\"dry_slab\"|\"loose_wet\"|\"loose_dry\"|null\n"
-        "      },\n"
-        "      \"snow_surface\": {\n"
-        "        \"full_coverage\": true|false|null,\n"
-        "        \"cornice\": string|null,\n"
-        "        \"wind_loading\": string|null,\n"
-        "        \"melt_freeze_crust\": string|boolean|null\n"
-        "      },\n"
-        "      \"terrain\": {\n"
-        "        \"slope_angle_class\": string|null,\n"
-        "        \"aspect\": string|null,\n"
-        "        \"terrain_trap\": [string, ...]|null,\n"
-        "        \"elevation_band\": string|null\n"
-        "      },\n"
-        "      \"glacier\": {\n"
-        "        \"crevasses\": string|boolean|null,\n"
-        "        \"seracs\": string|boolean|null,\n"
-        "        \"snow_bridge_likely\": string|boolean|null\n"
-        "      },\n"
-        "      \"weather\": {\n"
-        "        \"sky\": string|null,\n"
-        "        \"visibility\": string|null,\n"
-        "        \"precip\": string|null,\n"
-        "        \"wind\": string|null\n"
-        "      },\n"
-        "      \"human_activity\": {\n"
-        "        \"tracks\": string|boolean|null,\n"
-        "        \"people_present\": boolean|null,\n"
-        "        \"rope_or_harness\": boolean|null,\n"
-        "        \"helmet\": boolean|null\n"
-        "      },\n"
-        "      \"rescue\": {\n"
-        "        \"helicopter\": boolean|null,\n"
-        "        \"longline\": boolean|null,\n"
-        "        \"recco\": boolean|null,\n"
-        "        \"personnel_on_foot\": boolean|null\n"
-        "      }\n"
-        "    },\n"
-        "    \"confidence\": number\n"
-        "  },\n"
-        "  \"mountaineering_extras\": {\n"
-        "    \"geo_points\": {\n"
-        "      \"glacier_name\": string|null,\n"
-        "      \"camp_location\": string|null,\n"
-        "      \"summit_feature\": string|null\n"
-        "    },\n"
-        "    \"route_character\": string|null,\n"
-        "    \"objective_hazards\": [string, ...]|null,\n"
-        "    \"technical_rating_est\": string|null,\n"
-        "    \"incline_degrees\": {\n"
-        "      \"glacier_lower\": string|null,\n"
-        "      \"approach_to_high_camp\": string|null,\n"
-        "      \"ridge_section\": string|null\n"
-        "    },\n"
-        "    \"glacier_condition_est\": string|null,\n"
-        "    \"approach_mode\": string|null,\n"
-        "    \"retreat_options\": string|null\n"
-        "  }\n"
-        "}"
+    prefix = f"data:image/{ext};base64,".encode('ascii')
+    if raw is not None:
+        return _b64_stream(io.BytesIO(raw), prefix)
+    with open(image_path, 'rb') as f:
+        return _b64_stream(f, prefix)
+
+
+def _hosted_image_url(image_path: str) -> str | None:
+    if not OCR_IMAGE_URL_BASE:
+        return None
+    if os.path.splitext(image_path)[1].lower().lstrip('.') not in _API_IMAGE_EXTS:
+        return None
+    rel = os.path.relpath(os.path.abspath(image_path), os.path.abspath(OCR_IMAGE_ROOT))
+    if rel.startswith('..'):
+        return None
+    return f"{OCR_IMAGE_URL_BASE}/{quote(Path(rel).as_posix())}"
+
+
+def _image_url(
+    image_path: str,
+    size: tuple[int, int] | None = None,
+    detail: str | None = None,
+    raw: bytes | None = None,
+) -> str:
+    """URL for the image_url block: the hosted URL when configured, else a data URL."""
+    return _hosted_image_url(image_path) or _encode_image_as_data_url(image_path, size, detail, raw)
+
+
+# Output schema sent ahead of every image when OCR_STRICT_SCHEMA is off. Keep
+# it free of interpolation so the prefix stays identical across calls.
+_SCHEMA_PROMPT = (
+    "Return ONE JSON object only (no prose). Use exactly these keys and subkeys. If uncertain or not visible, use nulls. Units: include both ft/m where applicable.\n\n"
+    "{\n"
+    "  \"ocr\": {\n"
+    "    \"model\": null,\n"
+    "    \"summary\": \"short high-level description\",\n"
+    "    \"signals\": {\n"
+    "      \"avalanche_signs\": {\n"
+    "        \"crown_line\": true|false|null,\n"
+    "        \"debris\": true|false|null,\n"
+    "        \"slide_paths\": string|null,\n"
+    "        \"size_est\": \"D1\"|\"D2\"|\"D3\"|null,\n"
+    "        \"slab_type\": \"wind\"|\"persistent\"|\"storm\"|\"wet_slab\"|\"dry_slab\"|\"loose_wet\"|\"loose_dry\"|null\n"
+    "      },\n"
+    "      \"snow_surface\": {\n"
+    "        \"full_coverage\": true|false|null,\n"
+    "        \"cornice\": string|null,\n"
+    "        \"wind_loading\": string|null,\n"
+    "        \"melt_freeze_crust\": string|boolean|null\n"
+    "      },\n"
+    "      \"terrain\": {\n"
+    "        \"slope_angle_class\": string|null,\n"
+    "        \"aspect\": string|null,\n"
+    "        \"terrain_trap\": [string, ...]|null,\n"
+    "        \"elevation_band\": string|null\n"
+    "      },\n"
+    "      \"glacier\": {\n"
+    "        \"crevasses\": string|boolean|null,\n"
+    "        \"seracs\": string|boolean|null,\n"
+    "        \"snow_bridge_likely\": string|boolean|null\n"
+    "      },\n"
+    "      \"weather\": {\n"
+    "        \"sky\": string|null,\n"
+    "        \"visibility\": string|null,\n"
+    "        \"precip\": string|null,\n"
+    "        \"wind\": string|null\n"
+    "      },\n"
+    "      \"human_activity\": {\n"
+    "        \"tracks\": string|boolean|null,\n"
+    "        \"people_present\": boolean|null,\n"
+    "        \"rope_or_harness\": boolean|null,\n"
+    "        \"helmet\": boolean|null\n"
+    "      },\n"
+    "      \"rescue\": {\n"
+    "        \"helicopter\": boolean|null,\n"
+    "        \"longline\": boolean|null,\n"
+    "        \"recco\": boolean|null,\n"
+    "        \"personnel_on_foot\": boolean|null\n"
+    "      }\n"
+    "    },\n"
+    "    \"confidence\": number\n"
+    "  },\n"
+    "  \"mountaineering_extras\": {\n"
+    "    \"geo_points\": {\n"
+    "      \"glacier_name\": string|null,\n"
+    "      \"camp_location\": string|null,\n"
+    "      \"summit_feature\": string|null\n"
+    "    },\n"
+    "    \"route_character\": string|null,\n"
+    "    \"objective_hazards\": [string, ...]|null,\n"
+    "    \"technical_rating_est\": string|null,\n"
+    "    \"incline_degrees\": {\n"
+    "      \"glacier_lower\": string|null,\n"
+    "      \"approach_to_high_camp\": string|null,\n"
+    "      \"ridge_section\": string|null\n"
+    "    },\n"
+    "    \"glacier_condition_est\": string|null,\n"
+    "    \"approach_mode\": string|null,\n"
+    "    \"retreat_options\": string|null\n"
+    "  }\n"
+    "}"
+)
+
+
+def _n(*types: str) -> Dict[str, Any]:
+    return {"type": [*types, "null"]}
+
+
+def _enum(*values: str) -> Dict[str, Any]:
+    return {"type": ["string", "null"], "enum": [*values, None]}
+
+
+def _obj(props: Dict[str, Any]) -> Dict[str, Any]:
+    # strict mode: every key required, no extras (optional values are nullable)
+    return {"type": "object", "properties": props, "required": list(props), "additionalProperties": False}
+
+
+# _SCHEMA_PROMPT as a JSON Schema, enforced server-side via structured outputs.
+_STR_LIST = {"type": ["array", "null"], "items": {"type": "string"}}
+_RESULT_SCHEMA = _obj({
+    "ocr": _obj({
+        "model": _n("string"),
+        "summary": _n("string"),
+        "signals": _obj({
+            "avalanche_signs": _obj({
+                "crown_line": _n("boolean"),
+                "debris": _n("boolean"),
+                "slide_paths": _n("string"),
+                "size_est": _enum("D1", "D2", "D3"),
+                "slab_type": _enum("wind", "persistent", "storm", "wet_slab", "dry_slab", "loose_wet", "loose_dry"),
+            }),
+            "snow_surface": _obj({
+                "full_coverage": _n("boolean"),
+                "cornice": _n("string"),
+                "wind_loading": _n("string"),
+                "melt_freeze_crust": _n("string", "boolean"),
+            }),
+            "terrain": _obj({
+                "slope_angle_class": _n("string"),
+                "aspect": _n("string"),
+                "terrain_trap": _STR_LIST,
+                "elevation_band": _n("string"),
+            }),
+            "glacier": _obj({
+                "crevasses": _n("string", "boolean"),
+                "seracs": _n("string", "boolean"),
+                "snow_bridge_likely": _n("string", "boolean"),
+            }),
+            "weather": _obj({
+                "sky": _n("string"),
+                "visibility": _n("string"),
+                "precip": _n("string"),
+                "wind": _n("string"),
+            }),
+            "human_activity": _obj({
+                "tracks": _n("string", "boolean"),
+                "people_present": _n("boolean"),
+                "rope_or_harness": _n("boolean"),
+                "helmet": _n("boolean"),
+            }),
+            "rescue": _obj({
+                "helicopter": _n("boolean"),
+                "longline": _n("boolean"),
+                "recco": _n("boolean"),
+                "personnel_on_foot": _n("boolean"),
+            }),
+        }),
+        "confidence": {"type": "number"},
+    }),
+    "mountaineering_extras": _obj({
+        "geo_points": _obj({
+            "glacier_name": _n("string"),
+            "camp_location": _n("string"),
+            "summit_feature": _n("string"),
+        }),
+        "route_character": _n("string"),
+        "objective_hazards": _STR_LIST,
+        "technical_rating_est": _n("string"),
+        "incline_degrees": _obj({
+            "glacier_lower": _n("string"),
+            "approach_to_high_camp": _n("string"),
+            "ridge_section": _n("string"),
+        }),
+        "glacier_condition_est": _n("string"),
+        "approach_mode": _n("string"),
+        "retreat_options": _n("string"),
+    }),
+})
+_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {"name": "climbing_signals", "strict": True, "schema": _RESULT_SCHEMA},
+}
+# Multi-image requests: one result per image, in input order.
+_MULTI_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "climbing_signals_list",
+        "strict": True,
+        "schema": _obj({"results": {"type": "array", "items": _RESULT_SCHEMA}}),
+    },
+}
+
+
+def _request_options(multi: bool = False) -> Dict[str, Any]:
+    """Extra chat.completions arguments shared by the sync and batch paths."""
+    if not OCR_STRICT_SCHEMA:
+        return {}
+    return {"response_format": _MULTI_RESPONSE_FORMAT if multi else _RESPONSE_FORMAT}
+
+
+# With structured outputs the schema travels in response_format and the
+# server guarantees the shape, so the prompt only carries what the schema
+# cannot express.
+_STRICT_PROMPT = (
+    "Assess the mountaineering and avalanche conditions visible in the image. "
+    "ocr.summary is a short high-level description. If uncertain or not visible, use nulls. "
+    "Units: include both ft/m where applicable."
+)
+
+
+def _system_prompt() -> str:
+    return _STRICT_PROMPT if OCR_STRICT_SCHEMA else _SCHEMA_PROMPT
+
+
+def _vision_messages(image_data_url: str, detail: str | None = None) -> list:
+    # Static schema first as its own message, variable image last: the shared
+    # prefix is byte-identical across calls and eligible for prompt caching.
+    detail = _resolve_detail(detail)
+    return [
+        {"role": "system", "content": _system_prompt()},
+        {
+            "role": "user",
+            "content": [
+                {"type": "image_url", "image_url": {"url": image_data_url, "detail": detail}},
+            ],
+        },
+    ]
+
+
+def _multi_vision_messages(image_data_urls: list[str], detail: str | None = None) -> list:
+    n = len(image_data_urls)
+    detail = _resolve_detail(detail)
+    return [
+        {"role": "system", "content": _system_prompt()},
+        {
+            "role": "user",
+            "content": [
+                {
+                    "type": "text",
+                    "text": f'{n} images follow. Return {{"results": [...]}} holding {n} result objects, one per image, in input order.',
+                },
+                *({"type": "image_url", "image_url": {"url": url, "detail": detail}} for url in image_data_urls),
+            ],
+        },
+    ]
+
+
+# Per-request token reservation for the TPM limiter. Until usage has been
+# observed for a (model, detail) pair, assume prompt text at ~4 bytes/token,
+# the image at its detail-level cost (low = 85; high is 4 tiles * 170 + 85 for
+# a 1024px image) plus room for the JSON reply; afterwards use the EMA of
+# actual usage.
+_EST_COMPLETION_TOKENS = 800
+_token_estimator = TokenEstimator()
+
+
+def _usage_key(model: str, detail: str, n_images: int = 1) -> tuple:
+    return (model, detail) if n_images == 1 else (model, detail, n_images)
+
+
+def _estimate_tokens(model: str, detail: str, n_images: int = 1) -> int:
+    image = 85 if detail == 'low' else 765
+    return _token_estimator.estimate(
+        _usage_key(model, detail, n_images),
+        len(_system_prompt()) // 4 + n_images * (image + _EST_COMPLETION_TOKENS),
+    )
+
+
+def _chat_vision_json(client: OpenAI, model: str, image_data_url: str, detail: str | None = None) -> str:
+    detail = _resolve_detail(detail)
+    return _chat_json(client, model, _vision_messages(image_data_url, detail), detail)
+
+
+def _chat_vision_json_multi(client: OpenAI, model: str, image_data_urls: list[str], detail: str | None = None) -> str:
+    detail = _resolve_detail(detail)
+    return _chat_json(
+        client, model, _multi_vision_messages(image_data_urls, detail), detail, n_images=len(image_data_urls)
     )
-    messages = [{
-        "role": "user",
-        "content": [
-            {"type": "text", "text": prompt},
-            {"type": "image_url", "image_url": {"url": image_data_url}},
-        ]
-    }]
-    extra = {}
+
+
+def _chat_json(client: OpenAI, model: str, messages: list, detail: str, n_images: int = 1) -> str:
     # service_tier is not passed to OpenAI API, only used for logging
-    extra = {}
-    resp = client.chat.completions.create(model=model, messages=messages, **extra)
+    extra = _request_options(multi=n_images > 1)
+    limiter.acquire(_estimate_tokens(model, detail, n_images))
+    try:
+        raw = client.chat.completions.with_raw_response.create(model=model, messages=messages, **extra)
+    except RateLimitError as e:
+        limiter.update_from_headers(getattr(getattr(e, 'response', None), 'headers', None))
+        raise
+    limiter.update_from_headers(raw.headers)
+    resp = raw.parse()
     try:
         usage = getattr(resp, 'usage', None)
         if usage is not None:
             pt = int(getattr(usage, 'prompt_tokens', 0) or 0)
             ct = int(getattr(usage, 'completion_tokens', 0) or 0)
             print(f"[tokens] model={model} tier={SERVICE_TIER} prompt={pt} completion={ct} total={pt+ct}")
+            _token_estimator.observe(_usage_key(model, detail, n_images), pt + ct)
     except Exception:
         pass
     return resp.choices[0].message.content.strip()
 
 
-def analyze_conditions(image_path: str) -> Dict[str, Any]:
-    api_key = os.getenv('OPENAI_API_KEY')
-    if not api_key or not can_make_call():
-        # Conservative scaffold when model can't be called
-        return {
-            "ocr": {
-                "model": None,
-                "summary": None,
-                "signals": {
-                    "avalanche_signs": {"crown_line": None, "debris": None, "slide_paths": None, "size_est": None, "slab_type": None},
-                    "snow_surface": {"full_coverage": None, "cornice": None, "wind_loading": None, "melt_freeze_crust": None},
-                    "terrain": {"slope_angle_class": None, "aspect": None, "terrain_trap": None, "elevation_band": None},
-                    "glacier": {"crevasses": None, "seracs": None, "snow_bridge_likely": None},
-                    "weather": {"sky": None, "visibility": None, "precip": None, "wind": None},
-                    "human_activity": {"tracks": None, "people_present": None, "rope_or_harness": None, "helmet": None},
-                    "rescue": {"helicopter": None, "longline": None, "recco": None, "personnel_on_foot": None}
-                },
-                "confidence": 0.0
-            },
-            "mountaineering_extras": {
-                "geo_points": {"glacier_name": None, "camp_location": None, "summit_feature": None},
-                "route_character": None,
-                "objective_hazards": None,
-                "technical_rating_est": None,
-                "incline_degrees": {"glacier_lower": None, 
-                "approach_to_high_camp": None, 
-                "ridge_section": None},
-                "glacier_condition_est": None,
-                "approach_mode": None,
-                "retreat_options": None
-            }
-        }
+def _first_json_object(text: str) -> str | None:
+    """Return the first balanced {...} substring of `text` (single linear scan).
 
-    client = OpenAI()
-    model = os.getenv('OCR_VISION_MODEL', OCR_VISION_MODEL)
-    image_url = _encode_image_as_data_url(image_path)
+    Braces inside JSON strings are ignored, so prose around the object or a
+    '}' inside a value does not cut it short.
+    """
+    start = text.find('{')
+    if start < 0:
+        return None
+    depth = 0
+    in_str = escaped = False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_str:
+            if escaped:
+                escaped = False
+            elif ch == '\\':
+                escaped = True
+            elif ch == '"':
+                in_str = False
+        elif ch == '"':
+            in_str = True
+        elif ch == '{':
+            depth += 1
+        elif ch == '}':
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+    return None
+
+
+def _coerce_result(content: str, model: str) -> tuple[Dict[str, Any], bool]:
+    """Parse a model reply into the expected structure.
 
-    # Make the call
-    content = _chat_vision_json(client, model, image_url)
+    Returns (obj, parsed); parsed is False when no JSON object could be found.
+    """
+    parsed = True
     try:
-        record_call(1)
+        obj = loads(content)
     except Exception:
-        pass
+        snippet = _first_json_object(content)
+        parsed = snippet is not None
+        if snippet:
+            obj = loads(snippet)
+        else:
+            obj = _empty_result()
+            obj['ocr']['model'] = model
+    return _ensure_keys(obj, model), parsed
+
 
-    # Parse and coerce into expected structure
+def _coerce_results(content: str, model: str, n: int) -> list[Dict[str, Any]] | None:
+    """Parse a multi-image reply; None unless it holds exactly `n` result objects."""
     try:
-        obj = json.loads(content)
+        obj = loads(content)
     except Exception:
-        m = re.search(r"\{.*\}", content, flags=re.S)
-        obj = json.loads(m.group(0)) if m else {
-            "ocr": {"model": model, "summary": None, "signals": {}, "confidence": 0.0},
-            "mountaineering_extras": {}
-        }
+        snippet = _first_json_object(content)
+        try:
+            obj = loads(snippet) if snippet else None
+        except Exception:
+            obj = None
+    results = obj.get('results') if isinstance(obj, dict) else None
+    if not isinstance(results, list) or len(results) != n or not all(isinstance(r, dict) for r in results):
+        return None
+    return [_ensure_keys(r, model) for r in results]
 
-    # ensure mandatory keys
+
+def _ensure_keys(obj: Dict[str, Any], model: str) -> Dict[str, Any]:
     obj.setdefault('ocr', {})
     obj.setdefault('mountaineering_extras', {})
-    if isinstance(obj['ocr'], dict) and 'model' not in obj['ocr']:
+    # the strict schema lets the model answer "model": null; record who replied,
+    # since _already_annotated only trusts results that name a model
+    if isinstance(obj['ocr'], dict) and not obj['ocr'].get('model'):
         obj['ocr']['model'] = model
     return obj
 
 
+def _empty_result() -> Dict[str, Any]:
+    """Conservative all-null scaffold for images that are not (or cannot be) analysed."""
+    return {
+        "ocr": {
+            "model": None,
+            "summary": None,
+            "signals": {
+                "avalanche_signs": {"crown_line": None, "debris": None, "slide_paths": None, "size_est": None, "slab_type": None},
+                "snow_surface": {"full_coverage": None, "cornice": None, "wind_loading": None, "melt_freeze_crust": None},
+                "terrain": {"slope_angle_class": None, "aspect": None, "terrain_trap": None, "elevation_band": None},
+                "glacier": {"crevasses": None, "seracs": None, "snow_bridge_likely": None},
+                "weather": {"sky": None, "visibility": None, "precip": None, "wind": None},
+                "human_activity": {"tracks": None, "people_present": None, "rope_or_harness": None, "helmet": None},
+                "rescue": {"helicopter": None, "longline": None, "recco": None, "personnel_on_foot": None}
+            },
+            "confidence": 0.0
+        },
+        "mountaineering_extras": {
+            "geo_points": {"glacier_name": None, "camp_location": None, "summit_feature": None},
+            "route_character": None,
+            "objective_hazards": None,
+            "technical_rating_est": None,
+            "incline_degrees": {"glacier_lower": None, "approach_to_high_camp": None, "ridge_section": None},
+            "glacier_condition_est": None,
+            "approach_mode": None,
+            "retreat_options": None
+        }
+    }
+
+
+_client: OpenAI | None = None
+_client_lock = threading.Lock()
+
+
+def _get_client() -> OpenAI:
+    """One client for the process: its pooled connections are reused across
+    images and worker threads instead of a TCP+TLS handshake per call."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = OpenAI()
+    return _client
+
+
+def analyze_conditions(
+    image_path: str,
+    size: tuple[int, int] | None = None,
+    digest: str | None = None,
+) -> Dict[str, Any]:
+    # Without a precomputed digest, read the file once: the same bytes give
+    # the byte-size and header checks, the cache key and the payload, with
+    # no separate stat or reopen.
+    raw = None
+    if digest is None:
+        try:
+            raw = Path(image_path).read_bytes()
+        except OSError:
+            pass
+    # Callers that did not pre-screen (size unknown) get the same cheap
+    # header/size/token check before any hashing, encoding or API call.
+    if size is None and OCR_SCREEN_IMAGES:
+        irrelevant, size = _screen_image(image_path, st_size=len(raw) if raw is not None else None, raw=raw)
+        if irrelevant:
+            return _empty_result()
+    model = _model_for(size)
+    detail = _detail_for(size)
+    if raw is not None:
+        digest = _bytes_digest(raw)
+    cache_key = _cache_key(digest, model, detail) if digest else None
+    if cache_key:
+        cached = _cache_get(cache_key)
+        if cached is not None:
+            return cached
+
+    api_key = os.getenv('OPENAI_API_KEY')
+    # check-and-count in one step: analyze_conditions runs on a thread pool
+    if not api_key or not try_reserve(1):
+        return _empty_result()
+
+    try:
+        client = _get_client()
+        image_url = _image_url(image_path, size, detail, raw)
+        content = _chat_vision_json(client, model, image_url, detail)
+    except Exception:
+        # failed calls do not count against the cap
+        release(1)
+        raise
+
+    obj, parsed = _coerce_result(content, model)
+    if parsed and cache_key:
+        _cache_put(cache_key, obj)
+    return obj
+
+
+def _analyze_many(items: list[tuple[str, tuple[int, int] | None, str | None]]) -> list[Dict[str, Any]]:
+    """analyze_conditions for several pre-screened (path, size, digest) items
+    sharing one model/detail, sending the uncached ones in a single request."""
+    if len(items) == 1:
+        return [analyze_conditions(*items[0])]
+    model = _model_for(items[0][1])
+    detail = _detail_for(items[0][1])
+    results: list[Dict[str, Any] | None] = []
+    keys: list[str | None] = []
+    for _path, _size, digest in items:
+        key = _cache_key(digest, model, detail) if digest else None
+        keys.append(key)
+        results.append(_cache_get(key) if key else None)
+    todo = [i for i, r in enumerate(results) if r is None]
+    if len(todo) > 1 and os.getenv('OPENAI_API_KEY') and try_reserve(1):
+        try:
+            urls = [_image_url(items[i][0], items[i][1], detail) for i in todo]
+            content = _chat_vision_json_multi(_get_client(), model, urls, detail)
+        except Exception:
+            release(1)
+            raise
+        objs = _coerce_results(content, model, len(todo))
+        if objs is None:
+            print(f"[WARN] Multi-image reply did not parse into {len(todo)} results; retrying one image per call")
+        else:
+            for i, obj in zip(todo, objs):
+                results[i] = obj
+                if keys[i]:
+                    _cache_put(keys[i], obj)
+    # a single leftover, an unparseable reply or no key/budget: same as one-by-one
+    return [r if r is not None else analyze_conditions(*item) for r, item in zip(results, items)]
+
+
+def _chunk_for_calls(groups: list) -> list[list]:
+    """Split duplicate groups into per-request chunks of up to OCR_IMAGES_PER_CALL
+    images that share a model and detail level."""
+    if OCR_IMAGES_PER_CALL == 1:
+        return [[g] for g in groups]
+    buckets: Dict[tuple, list] = {}
+    for g in groups:
+        size = g[0][2]
+        buckets.setdefault((_model_for(size), _detail_for(size)), []).append(g)
+    return [
+        bucket[i:i + OCR_IMAGES_PER_CALL]
+        for bucket in buckets.values()
+        for i in range(0, len(bucket), OCR_IMAGES_PER_CALL)
+    ]
+
+
+def _group_duplicates(items: list, digest_of) -> list[list]:
+    """Group work items whose images have identical bytes; items without a digest stay alone."""
+    groups: Dict[Any, list] = {}
+    for item in items:
+        digest = digest_of(item)
+        groups.setdefault(digest or id(item), []).append(item)
+    out = list(groups.values())
+    if len(out) < len(items):
+        print(f"[INFO] {len(items) - len(out)} duplicate images share a result with an identical image")
+    return out
+
+
+def _partial_path(p: Path) -> Path:
+    return p.with_name(p.name + '.partial.jsonl')
+
+
+def _replay_partial(partial: Path, data: list, json_path: Path | None = None) -> set[int]:
+    """Apply results logged by an interrupted run; return the indices restored.
+
+    A sidecar older than its JSON belongs to a previous version of the file
+    and is ignored. Each line must also still describe the entry at its
+    index: same local_image_path and, when logged, same image bytes.
+    """
+    done: set[int] = set()
+    try:
+        if json_path is not None and partial.stat().st_mtime < json_path.stat().st_mtime:
+            print(f"[INFO] Ignoring stale {partial.name} (older than {json_path.name})")
+            return done
+        lines = partial.read_bytes().splitlines()
+    except OSError:
+        return done
+    for line in lines:
+        try:
+            rec = loads(line)
+            entry = data[int(rec['idx'])]
+        except Exception:
+            # a torn last line from a crash mid-write
+            continue
+        path = rec.get('local_image_path')
+        if path is not None and path != entry.get('local_image_path'):
+            continue
+        if rec.get('image_hash'):
+            try:
+                if _bytes_digest(Path(path or entry['local_image_path']).read_bytes()) != rec['image_hash']:
+                    continue
+            except (OSError, KeyError):
+                continue
+        entry['ocr'] = rec.get('ocr')
+        entry['mountaineering_extras'] = rec.get('mountaineering_extras')
+        done.add(int(rec['idx']))
+    return done
+
+
+def _write_json_atomic(p: Path, data: Any) -> None:
+    tmp = p.with_name(p.name + '.tmp')
+    write_json(tmp, data)
+    os.replace(tmp, p)
+
+
 def enrich_json_with_conditions(json_path: str) -> None:
+    if OCR_USE_BATCH:
+        return enrich_json_with_conditions_batch(json_path)
     p = Path(json_path)
-    data = json.loads(p.read_text(encoding='utf-8'))
-    for entry in data:
-        img = entry.get('local_image_path')
-        if not img or not os.path.exists(img):
-            continue
-        result = analyze_conditions(img)
-        entry['ocr'] = result.get('ocr')
-        entry['mountaineering_extras'] = result.get('mountaineering_extras')
-    p.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding='utf-8')
+    data = read_json(p)
+    # Every finished call is appended to a sidecar log and fsync'd, so a crash
+    # mid-run loses no paid-for results; the next run replays it first.
+    partial = _partial_path(p)
+    restored = _replay_partial(partial, data, p)
+    if restored:
+        print(f"[INFO] Restored {len(restored)} OCR results from {partial.name}")
+    todo = [t for t in _relevant_entries(data) if t[0] not in restored]
+    if not todo and not restored:
+        # nothing changed: leave the file (and its mtime) alone
+        partial.unlink(missing_ok=True)
+        print(f"[INFO] ⏩ OCR already up to date: {json_path}")
+        return
+    _log_buckets([size for _idx, _e, size, _digest in todo])
+    # Each image is an independent, latency-bound API call: run them on a
+    # bounded thread pool and log results as they complete.
+    # Byte-identical images within the run are analysed once.
+    if todo:
+        chunks = _chunk_for_calls(_group_duplicates(todo, lambda t: t[3]))
+        workers = min(OCR_CONCURRENCY, len(chunks))
+        with ThreadPoolExecutor(max_workers=workers) as ex, partial.open('ab') as log:
+            futures = {
+                ex.submit(_analyze_many, [(g[0][1]['local_image_path'], g[0][2], g[0][3]) for g in chunk]): chunk
+                for chunk in chunks
+            }
+            for fut in as_completed(futures):
+                for group, result in zip(futures[fut], fut.result()):
+                    for idx, entry, _size, digest in group:
+                        _assign_result(entry, result, digest)
+                        log.write(dumps_bytes({
+                            'idx': idx,
+                            'local_image_path': entry['local_image_path'],
+                            'image_hash': digest,
+                            'ocr': entry['ocr'],
+                            'mountaineering_extras': entry['mountaineering_extras'],
+                        }, indent=False) + b'\n')
+                log.flush()
+                os.fsync(log.fileno())
+    _write_json_atomic(p, data)
+    partial.unlink(missing_ok=True)
     print(f"[INFO] ✅ Updated JSON with GPT-only OCR: {json_path}")
 
 
+def _reserve_upto(n: int) -> int:
+    """Atomically reserve as many of `n` calls as the cap allows; returns how many."""
+    while n > 0 and not try_reserve(n):
+        left = remaining()
+        n = min(n - 1, left if left is not None else n - 1)
+    return max(n, 0)
+
+
+def _batch_output_text(client: OpenAI, file_id: str) -> str:
+    content = client.files.content(file_id)
+    text = getattr(content, 'text', None)
+    if isinstance(text, str):
+        return text
+    data = content.read() if hasattr(content, 'read') else content
+    return data.decode('utf-8') if isinstance(data, bytes) else str(data)
+
+
+def enrich_json_with_conditions_batch(json_path: str, poll_interval: float | None = None) -> None:
+    """Like enrich_json_with_conditions, but submits uncached images as one Batch API job.
+
+    Blocks until the batch reaches a terminal state. Entries the batch did not
+    return a result for are left untouched so a later run can retry them.
+    """
+    p = Path(json_path)
+    data = read_json(p)
+    model = os.getenv('OCR_VISION_MODEL', OCR_VISION_MODEL)
+    todo = _relevant_entries(data)
+    if not todo:
+        print(f"[INFO] ⏩ OCR already up to date: {json_path}")
+        return
+
+    # Serve cached results locally; only the remainder goes into the batch.
+    pending: list[tuple[int, Dict[str, Any], str | None, tuple[int, int] | None, str | None]] = []
+    for idx, entry, size, digest in todo:
+        key = _cache_key(digest, model, _detail_for(size)) if digest else None
+        cached = _cache_get(key) if key else None
+        if cached is not None:
+            _assign_result(entry, cached, digest)
+        else:
+            pending.append((idx, entry, key, size, digest))
+
+    # Reserve the batch's calls up front. Groups beyond the key/call budget get
+    # the empty scaffold, as the synchronous path gives them, and make no calls,
+    # so a later run can retry them.
+    groups = _group_duplicates(pending, lambda t: t[4]) if pending else []
+    granted = _reserve_upto(len(groups)) if os.getenv('OPENAI_API_KEY') else 0
+    if granted < len(groups):
+        if granted:
+            print(f"[WARN] OpenAI call cap allows {granted} of {len(groups)} batch requests")
+        for group in groups[granted:]:
+            for _idx, entry, _key, _size, digest in group:
+                _assign_result(entry, _empty_result(), digest)
+        groups = groups[:granted]
+
+    if groups:
+        # a batch input file may only target one model: no small-model routing here
+        _log_buckets([g[0][3] for g in groups], route_models=False)
+
+        def _batch_line(group: list) -> bytes:
+            idx, entry, _key, size, _digest = group[0]
+            detail = _detail_for(size)
+            image_url = _image_url(entry['local_image_path'], size, detail)
+            body = {"model": model, "messages": _vision_messages(image_url, detail), **_request_options()}
+            return dumps_bytes({
+                "custom_id": str(idx),
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": body,
+            }, indent=False)
+
+        # Decode/resize/encode releases the GIL in PIL and binascii, so build
+        # the request lines in parallel rather than one image at a time.
+        try:
+            with ThreadPoolExecutor(max_workers=min(os.cpu_count() or 1, len(groups))) as ex:
+                lines = list(ex.map(_batch_line, groups))
+            client = _get_client()
+            batch_file = client.files.create(
+                file=(f"{p.stem}.ocr_batch.jsonl", b"\n".join(lines)),
+                purpose='batch',
+            )
+            batch = client.batches.create(
+                input_file_id=batch_file.id,
+                endpoint='/v1/chat/completions',
+                completion_window='24h',
+            )
+        except Exception:
+            # nothing was submitted: give the reserved calls back
+            release(len(groups))
+            raise
+        print(f"[INFO] Submitted OCR batch {batch.id} with {len(groups)} images")
+
+        interval = OCR_BATCH_POLL_SECONDS if poll_interval is None else poll_interval
+        while batch.status not in _BATCH_TERMINAL:
+            time.sleep(interval)
+            batch = client.batches.retrieve(batch.id)
+        if batch.status != 'completed':
+            print(f"[WARN] OCR batch {batch.id} ended with status {batch.status}")
+
+        by_idx = {g[0][0]: g for g in groups}
+        done = 0
+        if getattr(batch, 'output_file_id', None):
+            for line in _batch_output_text(client, batch.output_file_id).splitlines():
+                if not line.strip():
+                    continue
+                try:
+                    rec = loads(line)
+                    group = by_idx[int(rec['custom_id'])]
+                    content = rec['response']['body']['choices'][0]['message']['content'].strip()
+                except Exception:
+                    continue
+                obj, parsed = _coerce_result(content, model)
+                for _idx, entry, _key, _size, digest in group:
+                    _assign_result(entry, obj, digest)
+                key = group[0][2]
+                if parsed and key:
+                    _cache_put(key, obj)
+                done += 1
+        if done < len(groups):
+            print(f"[WARN] OCR batch {batch.id}: no result for {len(groups) - done} of {len(groups)} images")
+
+    _write_json_atomic(p, data)
+    print(f"[INFO] ✅ Updated JSON with GPT-only OCR (batch): {json_path}")
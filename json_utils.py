@@ -0,0 +1,46 @@
+"""Fast JSON file helpers.
+
+Uses `orjson` when it is installed (several times faster than the stdlib for
+the multi-kilobyte cache/artifact payloads this project writes) and falls back
+to the stdlib `json` module otherwise. Output is UTF-8 with 2-space indentation
+either way, matching the files previously written with
+``json.dump(..., ensure_ascii=False, indent=2)``.
+"""
+import json
+from pathlib import Path
+from typing import Any
+
+try:
+    import orjson  # type: ignore
+    _HAS_ORJSON = True
+except Exception:
+    orjson = None  # type: ignore
+    _HAS_ORJSON = False
+
+
+def dumps_bytes(obj: Any, indent: bool = True) -> bytes:
+    """Serialize `obj` to UTF-8 JSON bytes."""
+    if _HAS_ORJSON:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+        except TypeError:
+            # e.g. non-str dict keys or >64-bit ints: let the stdlib handle it
+            pass
+    return json.dumps(obj, ensure_ascii=False, indent=2 if indent else None).encode('utf-8')
+
+
+def loads(data: str | bytes) -> Any:
+    """Parse JSON from str or bytes."""
+    if _HAS_ORJSON:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def read_json(path: str | Path) -> Any:
+    """Read and parse a JSON file (raises on missing/invalid files)."""
+    return loads(Path(path).read_bytes())
+
+
+def write_json(path: str | Path, obj: Any, indent: bool = True) -> None:
+    """Serialize `obj` and write it to `path` in a single write."""
+    Path(path).write_bytes(dumps_bytes(obj, indent=indent))
@@ -1,6 +1,15 @@
 import logging
 import os
 
+_LEVELS = {n: getattr(logging, n) for n in ('DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL')}
+_CONFIGURED = False
+
+
+def level_for(name: str) -> int:
+    """Numeric logging level for a level name ('warn' accepted); INFO if unknown."""
+    name = name.upper()
+    return _LEVELS.get('WARNING' if name == 'WARN' else name, logging.INFO)
+
 
 def configure_logging(level: str | None = None) -> None:
     """Configure default root logging only if not already configured.
@@ -8,10 +17,14 @@ def configure_logging(level: str | None = None) -> None:
     This helper respects the LOG_LEVEL environment variable and any explicit
     `level` argument. It calls basicConfig only when the root logger has no
     handlers, otherwise it only sets the root level. This avoids double-
-    configuring logging when running under test harnesses.
+    configuring logging when running under test harnesses. Repeat calls
+    without an explicit `level` are no-ops once logging is configured.
     """
+    global _CONFIGURED
+    if _CONFIGURED and level is None:
+        return
     chosen = (os.getenv("LOG_LEVEL") or level or "INFO").upper()
-    lvl = getattr(logging, chosen, logging.INFO)
+    lvl = _LEVELS.get(chosen, logging.INFO)
     root = logging.getLogger()
 
     if not root.handlers:
@@ -22,3 +35,4 @@ def configure_logging(level: str | None = None) -> None:
         )
     else:
         root.setLevel(lvl)
+    _CONFIGURED = True
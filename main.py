@@ -9,46 +9,57 @@ Orchestrates full pipeline:
 import sys
 import os
 import argparse
+import functools
 import logging
-from typing import List
-from extract_captions import extract_and_save
-from image_ocr import enrich_json_with_conditions
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Iterable, List
 from pathlib import Path
-from accident_info import extract_accident_info, batch_extract_accident_info
-from event_id_service import assign_ids_over_artifacts as _assign_event_ids
-from event_merge_service import run_merge_and_fusion as _merge_and_fuse
-from services.report_service import generate_report as _generate_report
 from config import SERVICE_TIER
-from urllib.parse import urlparse
-from store_artifacts import force_rebuild_and_upload_artifacts_csv
-from logging_config import configure_logging
+from logging_config import configure_logging, level_for
 from token_tracker import summary as token_summary
 
+# Pipeline stages (extract_captions, image_ocr, accident_info, the services,
+# store_artifacts) pull in the OpenAI SDK, PIL, bs4 and friends; they are
+# imported where used so --help and service-only runs start quickly.
+
 # configure module-level logger; main() will configure root logging
 logger = logging.getLogger(__name__)
 
+# URLs processed in parallel by the per-URL loop. URLs on the same host always
+# run one after another (artifact run dirs are per-host timestamps, and it
+# keeps the load on each site unchanged), so this bounds how many hosts are
+# in flight at once.
+PIPE_CONCURRENCY = max(1, int(os.getenv('PIPE_CONCURRENCY', '1')))
+
 
 def ts_print(*args, level: str = 'info', **kwargs):
     """Compatibility wrapper used across the CLI to print timestamped messages.
 
     It forwards messages to the logging system so verbosity can be controlled centrally.
+    Arguments are only joined when the level is enabled.
     """
-    msg = " ".join(str(a) for a in args)
-    lvl = level.lower()
-    if lvl == 'debug':
-        logger.debug(msg, **kwargs)
-    elif lvl == 'warning' or lvl == 'warn':
-        logger.warning(msg, **kwargs)
-    elif lvl == 'error':
-        logger.error(msg, **kwargs)
-    else:
-        logger.info(msg, **kwargs)
+    lvl = level_for(level)
+    if not logger.isEnabledFor(lvl):
+        return
+    logger.log(lvl, " ".join(map(str, args)), **kwargs)
 
-def _yn(prompt: str, default: bool = True) -> bool:
-    """Helper for interactive yes/no prompts. Skips in test environments."""
+def _interactive() -> bool:
+    """True when prompts can be answered: a terminal on stdin and not under pytest.
+
+    Headless runs (cron, CI, piped stdin) must never block on input().
+    """
     # In a test environment, pytest captures stdin, causing errors.
-    # Default to the 'default' value without prompting.
     if "PYTEST_CURRENT_TEST" in os.environ:
+        return False
+    try:
+        return sys.stdin.isatty()
+    except Exception:
+        return False
+
+def _yn(prompt: str, default: bool = True) -> bool:
+    """Helper for interactive yes/no prompts; returns `default` when not interactive."""
+    if not _interactive():
         return default
 
     d = 'Y/n' if default else 'y/N'
@@ -57,6 +68,186 @@ def _yn(prompt: str, default: bool = True) -> bool:
         return default
     return r in ('y', 'yes')
 
+def _assign_event_ids(**kwargs):
+    from event_id_service import assign_ids_over_artifacts
+    return assign_ids_over_artifacts(**kwargs)
+
+
+def _merge_and_fuse(**kwargs):
+    from event_merge_service import run_merge_and_fusion
+    return run_merge_and_fusion(**kwargs)
+
+
+def _generate_report(event_id: str, **kwargs):
+    from services.report_service import generate_report
+    return generate_report(event_id, **kwargs)
+
+
+def _generate_reports(targets: Iterable[str], *, audience: str, family_sensitive: bool, dry_run: bool,
+                      concurrency: int = PIPE_CONCURRENCY) -> int:
+    """Generate reports for `targets`, up to `concurrency` at a time; returns the number written.
+
+    Each report is an independent read-fused-JSON / LLM / write-Markdown job.
+    `targets` may be a lazy iterable: jobs start as they are submitted.
+    """
+    wrote = 0
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as ex:
+        futures = {
+            ex.submit(_generate_report, eid, audience=audience, family_sensitive=family_sensitive, dry_run=dry_run): eid
+            for eid in targets
+        }
+        for fut in as_completed(futures):
+            pth = fut.result()
+            if pth:
+                wrote += 1
+                ts_print(f"[report] wrote {pth}")
+    ts_print(f"[service] reports: {wrote}/{len(futures)} written{' (dry-run)' if dry_run else ''}")
+    return wrote
+
+
+def run_service_pipeline(*, run_assign: bool, run_merge: bool, run_reports: bool, dry: bool, clear: bool,
+                         event_id: str | None = None, audience: str = 'climbers',
+                         family_sensitive: bool = False, concurrency: int = PIPE_CONCURRENCY) -> None:
+    """Assign event IDs, merge/fuse events and generate reports (each step optional)."""
+    dry_note = ' (dry-run)' if dry else ''
+    if run_assign:
+        stats = _assign_event_ids(dry_run=dry, cache_clear=clear)
+        ts_print(f"[service] event_id assignment: files={stats.get('files',0)} clusters={stats.get('clusters',0)} written={stats.get('written',0)}{dry_note}")
+    if run_merge:
+        stats = _merge_and_fuse(dry_run=dry, cache_clear=clear)
+        ts_print(f"[service] merge+fusion: events={stats.get('events',0)} enriched={stats.get('enriched',0)} fused={stats.get('fused',0)}{dry_note}")
+        ts_print("[note] Fused outputs are canonical: events/fused/{event_id}.json")
+    if run_reports:
+        fused_dir = Path('events') / 'fused'
+        if event_id:
+            targets = [event_id]
+        elif fused_dir.is_dir():
+            targets = (p.stem for p in fused_dir.iterdir() if p.suffix == '.json')
+        else:
+            targets = []
+        _generate_reports(targets, audience=audience, family_sensitive=family_sensitive, dry_run=dry,
+                          concurrency=concurrency)
+
+
+def _rebuild_artifacts_csv() -> None:
+    from store_artifacts import force_rebuild_and_upload_artifacts_csv
+    force_rebuild_and_upload_artifacts_csv()
+
+
+# one URL per run of non-space, non-comma characters
+_URL_RE = re.compile(r'[^\s,]+')
+
+
+def iter_urls(path: str | Path):
+    """Yield URLs from a URLs file: one or more comma-separated per line, '#' comments skipped."""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.lstrip().startswith('#'):
+                continue
+            yield from _URL_RE.findall(line)
+
+
+@functools.lru_cache(maxsize=1024)
+def _host_of(url: str) -> str:
+    # same normalization as the artifact writers, so _latest_run finds their dirs
+    from accident_utils import url_domain
+    return url_domain(url)
+
+
+# Run dir names start with now_pst_filename_ts() (YYYYmmdd_HHMMSS).
+_RUN_DIR_RE = re.compile(r'\d{8}_\d{6}')
+
+
+@functools.lru_cache(maxsize=1024)
+def _latest_run(host: str) -> Path | None:
+    """Newest artifacts run dir for a host, or None.
+
+    Writers name host dirs with the slugified host; the raw host name is
+    tried as well for older trees. Run dirs are named with their creation
+    timestamp (YYYYmmdd_HHMMSS), so that name is the primary order. mtime
+    is not: re-enriching an old run (sidecar log, atomic captions.json
+    replace) bumps its dir mtime past newer runs. It only ranks dirs whose
+    names carry no timestamp, which always lose to timestamped ones. One
+    scandir pass; cached for the process: ocr-only runs, the only caller,
+    never create run dirs.
+    """
+    from accident_utils import slugify
+
+    def _order(e: os.DirEntry) -> tuple:
+        if _RUN_DIR_RE.match(e.name):
+            return (1, e.name, 0.0)
+        return (0, '', e.stat().st_mtime)
+
+    for base in (Path('artifacts') / slugify(host), Path('artifacts') / host):
+        if base.is_dir():
+            with os.scandir(base) as it:
+                latest = max((e for e in it if e.is_dir()), key=_order, default=None)
+            return Path(latest.path) if latest is not None else None
+    return None
+
+
+def _process_url(url: str, mode: str) -> None:
+    """Run the artifact-level steps for one URL in the given mode."""
+    from accident_info import extract_accident_info
+    from extract_captions import extract_and_save
+    from image_ocr import enrich_json_with_conditions
+    if mode == 'ocr-only':
+        latest = _latest_run(_host_of(url))
+        if latest is None:
+            ts_print(f"No artifact runs found for {url}; nothing to OCR")
+            return
+        json_path = str(latest / 'captions.json')
+        ts_print(f"Using existing captions.json: {json_path}")
+        enrich_json_with_conditions(json_path)
+
+    elif mode == 'text-only':
+        # New order: extract and analyze text first; skip image/OCR tasks
+        ts_print(f"[INFO] Extracting accident info for {url}")
+        extract_accident_info(url)
+
+    else:  # all
+        # New order: extract and analyze text first, then run image/OCR tasks
+        ts_print(f"[INFO] Extracting accident info for {url}")
+        extract_accident_info(url)
+        # Then extract captions/images and perform OCR enrichment
+        json_path = extract_and_save(url, run_ocr=True, download_images=True)
+        ts_print(f"[INFO] Enriching image captions with OCR/Vision for {url}")
+        enrich_json_with_conditions(json_path)
+
+
+def _process_urls(urls: List[str], mode: str, concurrency: int = PIPE_CONCURRENCY) -> None:
+    """Process URLs, running up to `concurrency` hosts in parallel.
+
+    Each step is network/LLM-bound, so threads overlap the waits. URLs of
+    one host stay sequential and in input order. When the mode extracts
+    artifacts, the artifacts CSV is rebuilt (and uploaded) once at the end
+    rather than after every URL.
+    """
+    try:
+        _run_urls(urls, mode, concurrency)
+    finally:
+        if urls and mode in ('text-only', 'all'):
+            _rebuild_artifacts_csv()
+
+
+def _run_urls(urls: List[str], mode: str, concurrency: int) -> None:
+    by_host: dict[str, List[str]] = {}
+    for url in urls:
+        by_host.setdefault(_host_of(url), []).append(url)
+    if concurrency <= 1 or len(by_host) <= 1:
+        for url in urls:
+            _process_url(url, mode)
+        return
+
+    def _run_host(host_urls: List[str]) -> None:
+        for url in host_urls:
+            _process_url(url, mode)
+
+    ts_print(f"[INFO] Processing {len(urls)} URLs across {len(by_host)} hosts, {concurrency} at a time")
+    with ThreadPoolExecutor(max_workers=min(concurrency, len(by_host))) as ex:
+        list(ex.map(_run_host, by_host.values()))
+
+
 if __name__ == "__main__":
     # Configure logging via helper (only sets defaults if not already configured).
     configure_logging()
@@ -78,6 +269,10 @@ if __name__ == "__main__":
     parser.add_argument('--audience', choices=['climbers','general'], default='climbers', help='Report audience (default: climbers)')
     parser.add_argument('--family-sensitive', action='store_true', help='Enable sensitive tone/redactions for reports')
     parser.add_argument('--service-tier', choices=['standard','flex','batch','priority'], default=None, help='Override SERVICE_TIER for this run')
+    parser.add_argument('--ocr-batch', action='store_true', help='Submit image OCR through the OpenAI Batch API (half price, results within 24h)')
+    parser.add_argument('--ocr-force', action='store_true', help='Re-run image OCR for entries that already have results')
+    parser.add_argument('--concurrency', type=int, default=PIPE_CONCURRENCY,
+                        help='Hosts processed in parallel by the per-URL pipeline, and reports generated in parallel (default: PIPE_CONCURRENCY or 1)')
     args = parser.parse_args()
 
     urls: List[str] = []
@@ -86,20 +281,14 @@ if __name__ == "__main__":
         if not p.exists():
             ts_print(f'URLs file not found: {args.urls_file}')
             sys.exit(1)
-        with open(p, 'r', encoding='utf-8') as f:
-            for line in f:
-                s = line.strip()
-                if not s or s.startswith('#'):
-                    continue
-                # Support comma-separated lists per line as well as one-per-line
-                parts = [x.strip() for x in s.split(',')]
-                for part in parts:
-                    if part:
-                        urls.append(part)
+        urls = list(iter_urls(p))
     elif not args.urls:
         # Interactive menu when no URLs provided: guide the user through common flows
         if args.assign_event_ids or args.merge_events or args.generate_reports:
             urls = []
+        elif not _interactive():
+            print('No URLs or service flags given and stdin is not a terminal; nothing to do.', file=sys.stderr)
+            sys.exit(2)
         else:
             print('\nNo URLs provided. Choose an action:')
             print('  1) Process a single URL now (interactive)')
@@ -130,17 +319,7 @@ if __name__ == "__main__":
                     args.batch_size = int(bs) if bs else args.batch_size
                 except Exception:
                     pass
-                # will flow into the urls_file branch above
-                p = Path(args.urls_file)
-                with open(p, 'r', encoding='utf-8') as f:
-                    for line in f:
-                        s = line.strip()
-                        if not s or s.startswith('#'):
-                            continue
-                        parts = [x.strip() for x in s.split(',')]
-                        for part in parts:
-                            if part:
-                                urls.append(part)
+                urls = list(iter_urls(args.urls_file))
             elif choice == '3':
                 print('\nService pipeline options:')
                 if _yn('Assign event IDs?', default=True):
@@ -190,6 +369,15 @@ if __name__ == "__main__":
     else:
         ts_print(f"[INFO] Using service_tier: {SERVICE_TIER}")
 
+    if args.ocr_batch:
+        import image_ocr
+        image_ocr.OCR_USE_BATCH = True
+        ts_print("[INFO] OCR will be submitted via the OpenAI Batch API")
+    if args.ocr_force:
+        import image_ocr
+        image_ocr.OCR_FORCE_REDO = True
+        ts_print("[INFO] OCR will re-analyse images that already have results")
+
     ts_print(f"[INFO] Running mode: {mode}")
 
     # Enable Drive sync when requested via CLI flag
@@ -202,12 +390,14 @@ if __name__ == "__main__":
         if args.write_drive:
             os.environ['WRITE_TO_DRIVE'] = 'true'
         ts_print(f'[INFO] Running batched extraction for {len(urls)} URLs with batch size {args.batch_size}')
+        from accident_info import batch_extract_accident_info
         written = batch_extract_accident_info(urls, batch_size=args.batch_size)
         ts_print(f'[INFO] Wrote {len(written)} artifacts')
         for p in written[:10]:
             ts_print(' -', p)
-        # After batched extraction, propose the service pipeline unless flags were provided.
-        if not (args.assign_event_ids or args.merge_events or args.generate_reports):
+        # After batched extraction, propose the service pipeline unless flags
+        # were provided (headless runs just stop here).
+        if not (args.assign_event_ids or args.merge_events or args.generate_reports) and _interactive():
             print('\nBatched artifact processing complete')
             if _yn('Run the service pipeline now (assign IDs, merge, generate reports)?', default=True):
                 dry = _yn('Dry run (compute only, do not write outputs)?', default=True)
@@ -229,143 +419,25 @@ if __name__ == "__main__":
                         report_family = True
 
                 ts_print('[INFO] Running selected service pipeline steps...')
-                if run_assign:
-                    stats = _assign_event_ids(dry_run=dry, cache_clear=clear)
-                    ts_print(f"[service] event_id assignment: files={stats.get('files',0)} clusters={stats.get('clusters',0)} written={stats.get('written',0)}{' (dry-run)' if dry else ''}")
-                if run_merge:
-                    stats = _merge_and_fuse(dry_run=dry, cache_clear=clear)
-                    ts_print(f"[service] merge+fusion: events={stats.get('events',0)} enriched={stats.get('enriched',0)} fused={stats.get('fused',0)}{' (dry-run)' if dry else ''}")
-                    ts_print('[note] Fused outputs are canonical: events/fused/{event_id}.json')
-                if run_reports:
-                    from pathlib import Path as _P
-                    fused_dir = _P('events') / 'fused'
-                    if report_eid:
-                        targets = [report_eid]
-                    else:
-                        targets = [p.stem for p in fused_dir.glob('*.json')]
-                    wrote = 0
-                    for eid in targets:
-                        pth = _generate_report(eid, audience=report_aud, family_sensitive=report_family, dry_run=dry)
-                        if pth:
-                            wrote += 1
-                            ts_print(f"[report] wrote {pth}")
-                    ts_print(f"[service] reports: {wrote}/{len(targets)} written{' (dry-run)' if dry else ''}")
+                run_service_pipeline(
+                    run_assign=run_assign, run_merge=run_merge, run_reports=run_reports, dry=dry, clear=clear,
+                    event_id=report_eid, audience=report_aud, family_sensitive=report_family,
+                    concurrency=max(1, args.concurrency),
+                )
         # exit after batch flow
         sys.exit(0)
 
     # Otherwise run per-URL behavior
-    for url in urls:
-        json_path = None
-        run_dir = None
-        if mode == 'ocr-only':
-            base = Path('artifacts') / Path(urlparse(url).netloc.replace('www.', ''))
-            if not base.exists():
-                ts_print(f"No artifacts found for {url}; nothing to OCR")
-                continue
-            runs = sorted([p for p in base.iterdir() if p.is_dir()])
-            if not runs:
-                ts_print(f"No runs found in {base}; nothing to OCR")
-                continue
-            latest = runs[-1]
-            json_path = str(latest / 'captions.json')
-            run_dir = str(latest)
-            ts_print(f"Using existing captions.json: {json_path}")
-            enrich_json_with_conditions(json_path)
-
-        elif mode == 'text-only':
-            # New order: extract and analyze text first; skip image/OCR tasks
-            ts_print(f"[INFO] Extracting accident info for {url}")
-            extract_accident_info(url)
-            # Always force CSV rebuild and Drive upload after extraction
-            force_rebuild_and_upload_artifacts_csv()
-
-        else:  # all
-            # New order: extract and analyze text first, then run image/OCR tasks
-            ts_print(f"[INFO] Extracting accident info for {url}")
-            extract_accident_info(url)
-            # Then extract captions/images and perform OCR enrichment
-            json_path = extract_and_save(url, run_ocr=True, download_images=True)
-            ts_print(f"[INFO] Enriching image captions with OCR/Vision for {url}")
-            enrich_json_with_conditions(json_path)
-            # Always force CSV rebuild and Drive upload after extraction
-            force_rebuild_and_upload_artifacts_csv()
-
-        # After artifact-level work, if the user didn't already request service flags,
-        # propose next steps (assign IDs, merge, generate reports) interactively.
-        # This helps the CLI drive the full pipeline without requiring flags up-front.
-        if not (args.assign_event_ids or args.merge_events or args.generate_reports) and not urls:
-            print('\nArtifact processing complete for:', url)
-            print('Proposed next steps: assign event IDs, merge/fuse per-event, and generate reports.')
-            if _yn('Run the service pipeline now (assign IDs, merge, generate reports)?', default=True):
-                # gather options
-                dry = _yn('Dry run (compute only, do not write outputs)?', default=True)
-                clear = _yn('Clear caches before compute?', default=False)
-                run_assign = _yn('Assign event IDs?', default=True)
-                run_merge = _yn('Merge events (enriched/fused)?', default=True)
-                run_reports = _yn('Generate reports?', default=False)
-                report_eid = None
-                report_aud = args.audience
-                report_family = args.family_sensitive
-                if run_reports:
-                    eid_in = input('Target event_id (leave empty for all): ').strip()
-                    if eid_in:
-                        report_eid = eid_in
-                    aud_in = input(f"Audience [climbers/general] (default: {args.audience}): ").strip().lower()
-                    if aud_in in ('climbers','general'):
-                        report_aud = aud_in
-                    if _yn('Family-sensitive tone?', default=args.family_sensitive):
-                        report_family = True
-
-                ts_print('[INFO] Running selected service pipeline steps...')
-                if run_assign:
-                    stats = _assign_event_ids(dry_run=dry, cache_clear=clear)
-                    ts_print(f"[service] event_id assignment: files={stats.get('files',0)} clusters={stats.get('clusters',0)} written={stats.get('written',0)}{' (dry-run)' if dry else ''}")
-                if run_merge:
-                    stats = _merge_and_fuse(dry_run=dry, cache_clear=clear)
-                    ts_print(f"[service] merge+fusion: events={stats.get('events',0)} enriched={stats.get('enriched',0)} fused={stats.get('fused',0)}{' (dry-run)' if dry else ''}")
-                    ts_print('[note] Fused outputs are canonical: events/fused/{event_id}.json')
-                if run_reports:
-                    from pathlib import Path as _P
-                    fused_dir = _P('events') / 'fused'
-                    if report_eid:
-                        targets = [report_eid]
-                    else:
-                        targets = [p.stem for p in fused_dir.glob('*.json')]
-                    wrote = 0
-                    for eid in targets:
-                        pth = _generate_report(eid, audience=report_aud, family_sensitive=report_family, dry_run=dry)
-                        if pth:
-                            wrote += 1
-                            ts_print(f"[report] wrote {pth}")
-                    ts_print(f"[service] reports: {wrote}/{len(targets)} written{' (dry-run)' if dry else ''}")
+    _process_urls(urls, mode, concurrency=max(1, args.concurrency))
 
     # Run service pipeline actions if requested
     if args.assign_event_ids or args.merge_events or args.generate_reports:
         ts_print("[INFO] Service pipeline starting...")
-        # 1) Assign event IDs
-        if args.assign_event_ids:
-            stats = _assign_event_ids(dry_run=args.dry_run, cache_clear=args.cache_clear)
-            ts_print(f"[service] event_id assignment: files={stats.get('files',0)} clusters={stats.get('clusters',0)} written={stats.get('written',0)}{' (dry-run)' if args.dry_run else ''}")
-        # 2) Merge and fuse
-        if args.merge_events:
-            stats = _merge_and_fuse(dry_run=args.dry_run, cache_clear=args.cache_clear)
-            ts_print(f"[service] merge+fusion: events={stats.get('events',0)} enriched={stats.get('enriched',0)} fused={stats.get('fused',0)}{' (dry-run)' if args.dry_run else ''}")
-            ts_print("[note] Fused outputs are canonical: events/fused/{event_id}.json")
-        # 3) Reports
-        if args.generate_reports:
-            from pathlib import Path as _P
-            fused_dir = _P('events') / 'fused'
-            if args.event_id:
-                targets = [args.event_id]
-            else:
-                targets = [p.stem for p in fused_dir.glob('*.json')]
-            wrote = 0
-            for eid in targets:
-                pth = _generate_report(eid, audience=args.audience, family_sensitive=args.family_sensitive, dry_run=args.dry_run)
-                if pth:
-                    wrote += 1
-                    ts_print(f"[report] wrote {pth}")
-            ts_print(f"[service] reports: {wrote}/{len(targets)} written{' (dry-run)' if args.dry_run else ''}")
+        run_service_pipeline(
+            run_assign=args.assign_event_ids, run_merge=args.merge_events, run_reports=args.generate_reports,
+            dry=args.dry_run, clear=args.cache_clear, event_id=args.event_id, audience=args.audience,
+            family_sensitive=args.family_sensitive, concurrency=max(1, args.concurrency),
+        )
 
     # Print overall token usage summary for this run
     try:
@@ -7,13 +7,31 @@ Env:
 Functions:
   can_make_call() -> bool
   record_call() -> None
+  try_reserve(n) -> bool  (atomic check-and-record for concurrent callers)
+  release(n) -> None  (give back a reservation whose call failed)
   remaining() -> int|None
+  flush() -> None  (also runs at interpreter exit)
+
+The count is kept in memory and written every _FLUSH_EVERY calls, and on
+every call once the cap is within _FLUSH_EVERY. Each write re-reads the file
+and adds only this process's unwritten increments, under an exclusive lock
+where fcntl is available, so concurrent processes do not overwrite each
+other's counts. Checks re-read the file when it changed since this process
+last synced (one stat per check) and whenever the cap is near. A hard crash,
+which skips the atexit flush, can lose up to _FLUSH_EVERY - 1 unwritten
+increments while the count is still far from the cap.
 """
+import atexit
 import os
 import json
 from pathlib import Path
 from threading import Lock
 
+try:
+    import fcntl  # POSIX only: serialises read-merge-write across processes
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None  # type: ignore
+
 _LOCK = Lock()
 _PATH = Path(os.getenv('OPENAI_CALLS_PATH', '.openai_calls.json'))
 try:
@@ -21,6 +39,14 @@ try:
 except Exception:
     _CAP = 0
 
+# In-memory count (file count at the last sync + this process's increments),
+# the file count and mtime at that sync, and whether increments are unwritten.
+_count: int | None = None
+_synced = 0
+_synced_mtime: int | None = None
+_dirty = False
+_FLUSH_EVERY = 10
+
 def _read_state():
     if not _PATH.exists():
         return {'count': 0}
@@ -33,32 +59,124 @@ def _read_state():
 def _write_state(state: dict):
     try:
         _PATH.parent.mkdir(parents=True, exist_ok=True)
-        with _PATH.open('w', encoding='utf-8') as f:
+        # write-then-rename: a crash mid-write never leaves a truncated file
+        tmp = _PATH.with_name(f"{_PATH.name}.{os.getpid()}.tmp")
+        with tmp.open('w', encoding='utf-8') as f:
             json.dump(state, f)
+        os.replace(tmp, _PATH)
+    except Exception:
+        pass
+
+def _disk_count() -> int:
+    try:
+        return int(_read_state().get('count', 0))
+    except Exception:
+        return 0
+
+def _mtime() -> int | None:
+    try:
+        return _PATH.stat().st_mtime_ns
+    except OSError:
+        return None
+
+def _current() -> int:
+    """Persisted count, loaded once per process; caller holds _LOCK."""
+    global _count, _synced, _synced_mtime
+    if _count is None:
+        _synced_mtime = _mtime()
+        _count = _synced = _disk_count()
+    return _count
+
+def _stale_locked() -> bool:
+    """True when the cap is near or another process wrote _PATH since our last sync."""
+    return _CAP - _current() <= _FLUSH_EVERY or _mtime() != _synced_mtime
+
+def _sync_locked() -> None:
+    """Merge this process's unwritten increments into the file count; caller holds _LOCK."""
+    global _count, _synced, _synced_mtime, _dirty
+    delta = _current() - _synced
+    lock_f = None
+    try:
+        if fcntl is not None:
+            _PATH.parent.mkdir(parents=True, exist_ok=True)
+            lock_f = open(_PATH.with_name(_PATH.name + '.lock'), 'a')
+            fcntl.flock(lock_f, fcntl.LOCK_EX)
+        merged = max(0, _disk_count() + delta)
+        if delta or _dirty:
+            _write_state({'count': merged})
+        _count = _synced = merged
+        _synced_mtime = _mtime()
+        _dirty = False
     except Exception:
         pass
+    finally:
+        if lock_f is not None:
+            lock_f.close()
 
 def can_make_call() -> bool:
     """Return True if a call may be made under current cap. If cap==0, unlimited."""
     if _CAP <= 0:
         return True
     with _LOCK:
-        st = _read_state()
-        return int(st.get('count', 0)) < _CAP
+        if _stale_locked():
+            _sync_locked()
+        return _current() < _CAP
 
 def remaining() -> int | None:
     if _CAP <= 0:
         return None
     with _LOCK:
-        st = _read_state()
-        return max(0, _CAP - int(st.get('count', 0)))
+        if _stale_locked():
+            _sync_locked()
+        return max(0, _CAP - _current())
+
+def _add_locked(n: int) -> None:
+    global _count, _dirty
+    before = _current()
+    _count = max(0, before + int(n))
+    _dirty = True
+    if _count // _FLUSH_EVERY != before // _FLUSH_EVERY or _CAP - _count <= _FLUSH_EVERY:
+        _flush_locked()
 
 def record_call(n: int = 1) -> None:
     """Increment persisted call count by n."""
     if _CAP <= 0:
         return
     with _LOCK:
-        st = _read_state()
-        c = int(st.get('count', 0)) + int(n)
-        st['count'] = c
-        _write_state(st)
+        _add_locked(n)
+
+def try_reserve(n: int = 1) -> bool:
+    """Atomically check the cap and count n calls; False (nothing counted) if they do not fit.
+
+    Concurrent workers must use this instead of can_make_call() + record_call():
+    with a gap between check and record, several workers can pass the check on
+    the last slot and overshoot the cap.
+    """
+    if _CAP <= 0:
+        return True
+    with _LOCK:
+        if _stale_locked():
+            # other processes may have spent the last slots: check the file
+            _sync_locked()
+        if _current() + int(n) > _CAP:
+            return False
+        _add_locked(n)
+        return True
+
+def release(n: int = 1) -> None:
+    """Return n reserved calls that were never completed."""
+    if _CAP <= 0:
+        return
+    with _LOCK:
+        _add_locked(-int(n))
+
+def _flush_locked() -> None:
+    if _dirty and _count is not None:
+        _sync_locked()
+
+def flush() -> None:
+    """Write any unpersisted increments to _PATH."""
+    with _LOCK:
+        _flush_locked()
+
+atexit.register(flush)
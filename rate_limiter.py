@@ -0,0 +1,159 @@
+"""Client-side requests/tokens-per-minute limiter for OpenAI calls.
+
+Blocks *before* a request would exceed the per-minute quota instead of
+learning about it from a 429, and resizes itself from the
+`x-ratelimit-*` headers returned with every response.
+
+Env:
+  OPENAI_MAX_RPM: requests per minute (0 or unset = learn from headers)
+  OPENAI_MAX_TPM: tokens per minute (0 or unset = learn from headers)
+
+Usage:
+  from rate_limiter import limiter
+  limiter.acquire(est_tokens)
+  ... make the call ...
+  limiter.update_from_headers(raw_response.headers)
+
+TokenEstimator sizes `est_tokens` from observed usage without a tokenizer.
+"""
+import math
+import os
+import threading
+import time
+from typing import Mapping
+
+
+def _env_float(name: str) -> float:
+    try:
+        return max(0.0, float(os.getenv(name, '0')))
+    except Exception:
+        return 0.0
+
+
+def _header_float(headers: Mapping[str, str], name: str) -> float | None:
+    try:
+        v = headers.get(name)
+        return float(v) if v is not None else None
+    except Exception:
+        return None
+
+
+class RateLimiter:
+    """Leaky-bucket limiter over two capacities (requests and tokens).
+
+    Each capacity refills continuously at limit/60 per second up to its
+    per-minute limit. A limit of 0 means unknown/unlimited for that
+    dimension until a response header reports one.
+    """
+
+    def __init__(self, max_rpm: float = 0.0, max_tpm: float = 0.0):
+        self._lock = threading.Lock()
+        self.max_rpm = float(max_rpm)
+        self.max_tpm = float(max_tpm)
+        self._requests = self.max_rpm
+        self._tokens = self.max_tpm
+        self._paused_until = 0.0
+        self._last = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._last
+        self._last = now
+        if self.max_rpm:
+            self._requests = min(self.max_rpm, self._requests + elapsed * self.max_rpm / 60.0)
+        if self.max_tpm:
+            self._tokens = min(self.max_tpm, self._tokens + elapsed * self.max_tpm / 60.0)
+
+    def acquire(self, tokens: int = 0) -> None:
+        """Block until one request and `tokens` tokens fit in the current window."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self._paused_until - now
+                if wait <= 0:
+                    # a single oversized request must still be able to go through
+                    need_tok = min(float(tokens), self.max_tpm) if self.max_tpm else 0.0
+                    req_ok = not self.max_rpm or self._requests >= 1.0
+                    tok_ok = not self.max_tpm or self._tokens >= need_tok
+                    if req_ok and tok_ok:
+                        if self.max_rpm:
+                            self._requests -= 1.0
+                        if self.max_tpm:
+                            self._tokens -= need_tok
+                        return
+                    wait = max(
+                        (1.0 - self._requests) * 60.0 / self.max_rpm if not req_ok else 0.0,
+                        (need_tok - self._tokens) * 60.0 / self.max_tpm if not tok_ok else 0.0,
+                    )
+            time.sleep(min(max(wait, 0.01), 60.0))
+
+    def pause(self, seconds: float) -> None:
+        """Hold all callers for `seconds` (e.g. from a 429's retry-after)."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + max(0.0, seconds))
+
+    def update_from_headers(self, headers: Mapping[str, str] | None) -> None:
+        """Adopt the server's view of limits and remaining capacity."""
+        if not headers:
+            return
+        limit_req = _header_float(headers, 'x-ratelimit-limit-requests')
+        limit_tok = _header_float(headers, 'x-ratelimit-limit-tokens')
+        rem_req = _header_float(headers, 'x-ratelimit-remaining-requests')
+        rem_tok = _header_float(headers, 'x-ratelimit-remaining-tokens')
+        retry_after = _header_float(headers, 'retry-after')
+        with self._lock:
+            self._refill(time.monotonic())
+            if limit_req and not _ENV_RPM:
+                self.max_rpm = limit_req
+            if limit_tok and not _ENV_TPM:
+                self.max_tpm = limit_tok
+            if rem_req is not None and self.max_rpm:
+                self._requests = min(self.max_rpm, rem_req)
+            if rem_tok is not None and self.max_tpm:
+                self._tokens = min(self.max_tpm, rem_tok)
+        if retry_after:
+            self.pause(retry_after)
+
+
+class TokenEstimator:
+    """O(1) per-category token estimate calibrated from `resp.usage`.
+
+    Keeps an exponentially weighted mean and variance of observed token
+    counts per category key (e.g. model + payload kind) and estimates
+    mean + gamma * std, so reservations lean conservative while the
+    observations are noisy.
+    """
+
+    def __init__(self, beta: float = 0.95, gamma: float = 1.0):
+        self._lock = threading.Lock()
+        self.beta = beta
+        self.gamma = gamma
+        self._stats: dict = {}
+
+    def estimate(self, key, default: int) -> int:
+        with self._lock:
+            st = self._stats.get(key)
+        if st is None:
+            return int(default)
+        mean, var = st
+        return int(math.ceil(mean + self.gamma * math.sqrt(var)))
+
+    def observe(self, key, tokens: int) -> None:
+        if tokens <= 0:
+            return
+        with self._lock:
+            st = self._stats.get(key)
+            if st is None:
+                self._stats[key] = (float(tokens), 0.0)
+                return
+            mean, var = st
+            a = 1.0 - self.beta
+            diff = tokens - mean
+            self._stats[key] = (mean + a * diff, self.beta * (var + a * diff * diff))
+
+
+_ENV_RPM = _env_float('OPENAI_MAX_RPM')
+_ENV_TPM = _env_float('OPENAI_MAX_TPM')
+
+# Shared by every caller in the process (the quota is per API key, not per module)
+limiter = RateLimiter(_ENV_RPM, _ENV_TPM)
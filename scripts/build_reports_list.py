@@ -5,17 +5,25 @@ Usage:
   python scripts/build_reports_list.py [--upload]
 
 If --upload is provided and env var GCS_BUCKET is set, the script uploads
-the resulting `list.json` to `gs://<GCS_BUCKET>/reports/list.json`.
+the resulting `list.json` to `gs://<GCS_BUCKET>/reports/list.json` with the
+google-cloud-storage client, falling back to `gsutil` when it is not installed.
 """
 from pathlib import Path
 import sys
-import json
 import argparse
 import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
-import frontmatter
 import re
+import subprocess
 import traceback
+
+try:
+    from google.cloud import storage  # type: ignore
+    GCS_CLIENT_AVAILABLE = True
+except ImportError:
+    storage = None  # type: ignore
+    GCS_CLIENT_AVAILABLE = False
 # Attempt to load a .env file in the project directory so os.getenv sees
 # local keys (e.g., GCS_BUCKET). Prefer python-dotenv if available; otherwise
 # fall back to a minimal manual parser so local development still works.
@@ -49,36 +57,52 @@ except Exception:
         pass
 
 ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from json_utils import dumps_bytes, loads, write_json  # noqa: E402  (orjson when installed)
+
 REPORTS_DIR = ROOT / 'events' / 'reports'
+# Parse workers (LIST_BUILDER_WORKERS) and the report count from which
+# processes are used instead of threads.
+_WORKERS = int(os.getenv('LIST_BUILDER_WORKERS', str(os.cpu_count() or 1)))
+_PROCESS_POOL_MIN = 64
+# Parsed items of unchanged reports are reused across runs; bump the version
+# whenever the item format changes.
+FRONTMATTER_CACHE = Path(os.getenv('LIST_BUILDER_CACHE', str(ROOT / '.frontmatter_cache.json')))
+_CACHE_VERSION = 3
 
 
 _PEAK_RE = re.compile(r'^peak/area\s*[:\-]\s*(.+)$', re.IGNORECASE)
 _ACTIVITY_RE = re.compile(r'^activity/style\s*[:\-]\s*(.+)$', re.IGNORECASE)
+# Peak/Area and Activity/Style body lines, optionally as list items
+_BODY_FIELDS_RE = re.compile(
+    r'^[ \t]*(?:[-*][ \t]+)?(peak/area|activity/style)[ \t]*[:\-][ \t]*(.+)$',
+    re.IGNORECASE | re.MULTILINE,
+)
+_HEADING_RE = re.compile(r'^[ \t]*#(.*)$', re.MULTILINE)
+_DELIM_RE = re.compile(rb'^[ \t]*---[ \t\r]*$', re.MULTILINE)
 
 
 def _load_frontmatter_lenient(path: Path):
     """A permissive front matter parser for simple key: value lines.
 
-    Handles cases where standard YAML parsing fails due to unquoted colons in values
+    Report front matter is flat `key: value` lines (see
+    services/report_render.front_matter), so this replaces a full YAML parse.
+    It also copes with unquoted colons in values that trip up YAML
     (e.g., 'date_of_event: Specific date known (month/day: August 12, year unknown)').
 
-    Returns (meta: dict, body: str) or (None, None) if the file does not appear
-    to contain a front matter block.
+    The file is read once as bytes and only split at the two `---` delimiter
+    lines. Returns (meta: dict, body: str). A file without a complete front
+    matter block yields ({}, whole text). Read errors propagate.
     """
-    try:
-        raw = path.read_text(encoding='utf-8', errors='replace')
-    except Exception:
-        return None, None
-    if not raw.startswith('---'):
-        return None, None
-    parts = raw.split('\n')
-    # Find second delimiter line index
-    delim_indices = [i for i, line in enumerate(parts) if line.strip() == '---']
-    if len(delim_indices) < 2:
-        return None, None
-    start, end = delim_indices[0], delim_indices[1]
-    fm_lines = parts[start + 1:end]
-    body = '\n'.join(parts[end + 1:])
+    raw = path.read_bytes()
+    first = _DELIM_RE.search(raw) if raw.startswith(b'---') else None
+    second = _DELIM_RE.search(raw, first.end()) if first else None
+    if second is None:
+        return {}, raw.decode('utf-8', errors='replace')
+    fm_lines = raw[first.end():second.start()].decode('utf-8', errors='replace').split('\n')
+    body = raw[second.end() + 1:].decode('utf-8', errors='replace')
     meta = {}
     current_key = None
     multiline_buffer = []
@@ -169,98 +193,136 @@ def _fallback_minimal_item(p: Path):
     }
 
 
-def scan_reports():
-    out = []
-    if not REPORTS_DIR.exists():
-        return out
-    for p in sorted(REPORTS_DIR.glob('*.md')):
+def _parse_one(p: Path) -> dict:
+    """Build the manifest item for one report (falls back to a minimal item)."""
+    try:
+        meta, body = _load_frontmatter_lenient(p)
+        peak = meta.get('peak') or ''
+        activity = ''
+        # one pass over the body for both labelled lines (front matter peak wins)
+        for m in _BODY_FIELDS_RE.finditer(body):
+            val = m.group(2).strip()
+            if m.group(1).lower() == 'peak/area':
+                peak = peak or val
+            elif not activity:
+                activity = val
+            if peak and activity:
+                break
+        if not activity:
+            activity = meta.get('activity') or meta.get('audience') or ''
+
+        date_of_event_val = meta.get('date_of_event') or meta.get('date') or ''
         try:
-            try:
-                fm = frontmatter.load(p)
-                meta = fm.metadata or {}
-                body = fm.content or ''
-            except Exception as yaml_err:
-                # Attempt lenient parse before giving up
-                meta, body = _load_frontmatter_lenient(p)
-                if meta is None:
-                    raise yaml_err
-            peak = meta.get('peak') or ''
-            if not peak:
-                # search body lines
-                for line in body.splitlines():
-                    raw_line = line.strip()
-                    if not raw_line:
-                        continue
-                    if raw_line.startswith('- ') or raw_line.startswith('* '):
-                        raw_line = raw_line[2:].strip()
-                    m = _PEAK_RE.match(raw_line)
-                    if m:
-                        peak = m.group(1).strip()
-                        break
-            activity = ''
-            for line in body.splitlines():
-                raw_line = line.strip()
-                if not raw_line:
-                    continue
-                if raw_line.startswith('- ') or raw_line.startswith('* '):
-                    raw_line = raw_line[2:].strip()
-                m = _ACTIVITY_RE.match(raw_line)
-                if m:
-                    activity = m.group(1).strip()
-                    break
-            if not activity:
-                activity = meta.get('activity') or meta.get('audience') or ''
-
-            date_of_event_val = meta.get('date_of_event') or meta.get('date') or ''
-            try:
-                if hasattr(date_of_event_val, 'isoformat'):
-                    date_of_event_val = date_of_event_val.isoformat()
-            except Exception:
-                date_of_event_val = str(date_of_event_val)
-
-            title = meta.get('title') or ''
+            if hasattr(date_of_event_val, 'isoformat'):
+                date_of_event_val = date_of_event_val.isoformat()
+        except Exception:
+            date_of_event_val = str(date_of_event_val)
+
+        title = meta.get('title') or ''
+        if not title:
+            # fallback to first heading in body
+            m = _HEADING_RE.search(body)
+            if m:
+                title = m.group(1).lstrip('#').strip()
             if not title:
-                # fallback to first heading in body
-                for l in body.splitlines():
-                    stripped = l.strip()
-                    if not stripped:
-                        continue
-                    if stripped.startswith('#'):
-                        title = stripped.lstrip('#').strip()
-                        break
-                if not title:
-                    title = p.stem
-
-            item = {
-                'id': p.stem,
-                'title': title,
-                'peak': peak,
-                'date_of_event': str(date_of_event_val) if date_of_event_val is not None else '',
-                'date': str(date_of_event_val) if date_of_event_val is not None else '',
-                'activity': activity,
-            }
-            out.append(item)
-        except Exception as e:  # noqa: BLE001
-            # Log warning and attempt deeper fallback extraction
-            print(f"[WARN] Failed to parse front matter for {p.name}: {e}", file=sys.stderr)
-            # Optionally include stack for debugging noisy parse issues
-            if os.getenv('LIST_BUILDER_DEBUG') == '1':
-                traceback.print_exc()
-            out.append(_fallback_minimal_item(p))
-    # Post-filter: ensure at least title present; if missing, attempt fallback again
-    cleaned = []
-    for item in out:
-        if 'title' not in item or not item.get('title'):
-            # Try to enrich
-            enriched = _fallback_minimal_item(REPORTS_DIR / f"{item['id']}.md")
-            # Merge keeping any existing values
-            merged = {**enriched, **item}
-            if not merged.get('title'):
-                merged['title'] = merged['id']
-            cleaned.append(merged)
+                title = p.stem
+
+        item = {
+            'id': p.stem,
+            'title': title,
+            'peak': peak,
+            'date_of_event': str(date_of_event_val) if date_of_event_val is not None else '',
+            'date': str(date_of_event_val) if date_of_event_val is not None else '',
+            'activity': activity,
+        }
+        return item
+    except Exception as e:  # noqa: BLE001
+        # Log warning and attempt deeper fallback extraction
+        print(f"[WARN] Failed to parse front matter for {p.name}: {e}", file=sys.stderr)
+        # Optionally include stack for debugging noisy parse issues
+        if os.getenv('LIST_BUILDER_DEBUG') == '1':
+            traceback.print_exc()
+        item = _fallback_minimal_item(p)
+        # the fallback only lacks a title when the file is unreadable
+        if not item.get('title'):
+            item['title'] = p.stem
+        return item
+
+
+def _load_cache() -> dict:
+    try:
+        data = loads(FRONTMATTER_CACHE.read_bytes())
+    except Exception:
+        return {}
+    if not isinstance(data, dict) or data.get('version') != _CACHE_VERSION:
+        return {}
+    return data.get('items') or {}
+
+
+def _save_cache(items: dict) -> None:
+    """Write the cache atomically; a failed write only costs a re-parse next run."""
+    try:
+        tmp = FRONTMATTER_CACHE.with_name(f"{FRONTMATTER_CACHE.name}.{os.getpid()}.tmp")
+        tmp.write_bytes(dumps_bytes({'version': _CACHE_VERSION, 'items': items}, indent=False))
+        os.replace(tmp, FRONTMATTER_CACHE)
+    except Exception as e:  # noqa: BLE001
+        print(f"[WARN] Could not write {FRONTMATTER_CACHE}: {e}", file=sys.stderr)
+
+
+def _parse_all(paths: list) -> list:
+    # Each report is an independent read + YAML parse. Small sets stay on a
+    # thread pool; large ones go to processes so parsing is not GIL-bound.
+    # map() keeps the output in path order.
+    workers = max(1, min(_WORKERS, len(paths)))
+    if workers > 1 and len(paths) >= _PROCESS_POOL_MIN:
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            return list(ex.map(_parse_one, paths, chunksize=16))
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        return list(ex.map(_parse_one, paths))
+
+
+def scan_reports():
+    if not REPORTS_DIR.exists():
+        return []
+    # one scandir pass: names and file types come from the directory listing
+    with os.scandir(REPORTS_DIR) as it:
+        entries = sorted((e for e in it if e.name.endswith('.md') and e.is_file()), key=lambda e: e.name)
+    paths = [Path(e.path) for e in entries]
+    # Unchanged files (same mtime and size) reuse last run's item: no read, no parse.
+    cache = _load_cache()
+    fresh = {}
+    keys = {}
+    stale = []
+    for e, p in zip(entries, paths):
+        st = e.stat()
+        keys[p.stem] = key = f"{p.stem}:{st.st_mtime_ns}:{st.st_size}"
+        hit = cache.get(p.stem)
+        if isinstance(hit, dict) and hit.get('key') == key:
+            fresh[p.stem] = hit
         else:
-            cleaned.append(item)
-    return cleaned
+            stale.append(p)
+    for p, item in zip(stale, _parse_all(stale) if stale else []):
+        fresh[p.stem] = {'key': keys[p.stem], 'item': item}
+    if stale or len(fresh) != len(cache):
+        _save_cache(fresh)
+    # every item carries a title (see _parse_one), so no second pass is needed
+    return [fresh[p.stem]['item'] for p in paths]
+
+
+def _upload_manifest(bucket: str, path: Path) -> None:
+    """Upload list.json in-process with google-cloud-storage, falling back to gsutil.
+
+    gsutil is used when the client is not installed, and also when it fails
+    (e.g. no application-default credentials while gsutil has its own auth).
+    """
+    if GCS_CLIENT_AVAILABLE:
+        try:
+            blob = storage.Client().bucket(bucket).blob('reports/list.json')
+            blob.upload_from_filename(str(path), content_type='application/json')
+            return
+        except Exception as e:  # noqa: BLE001 - auth (DefaultCredentialsError) and API errors alike
+            print(f"[WARN] GCS client upload failed ({e}); retrying with gsutil", file=sys.stderr)
+    subprocess.check_call(['gsutil', 'cp', str(path), f'gs://{bucket}/reports/list.json'])
 
 
 def main():
@@ -276,7 +338,7 @@ def main():
         print(f"[WARN] Dropped {len(items)-len(filtered)} empty items from manifest", file=sys.stderr)
     data = filtered
     out_path = Path('/tmp/list.json')
-    out_path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding='utf-8')
+    write_json(out_path, data)
     print(f'Wrote {out_path} ({len(data)} items)')
 
     if args.upload:
@@ -286,8 +348,7 @@ def main():
             return
         dest = f'gs://{bucket}/reports/list.json'
         print(f'Uploading to {dest}...')
-        import subprocess
-        subprocess.check_call(['gsutil', 'cp', str(out_path), dest])
+        _upload_manifest(bucket, out_path)
         print('Upload complete')
 
 
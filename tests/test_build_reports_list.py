@@ -0,0 +1,153 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'scripts'))
+
+import build_reports_list
+
+
+def _write_reports(tmp_path, n):
+    d = tmp_path / 'reports'
+    d.mkdir()
+    for i in range(n):
+        (d / f'ev{i:02d}.md').write_text(
+            f'---\ntitle: Report {i}\ndate_of_event: 2024-0{1 + i % 9}-01\n---\n'
+            f'# Heading\n- Peak/Area: Peak {i}\n- Activity/Style: Ski\n',
+            encoding='utf-8',
+        )
+    # unquoted colon in a value: strict YAML fails, the lenient parser copes
+    (d / 'ev99.md').write_text('---\ntitle: Odd: one\n---\nbody\n', encoding='utf-8')
+    return d
+
+
+def test_scan_reports_keeps_path_order_on_both_pools(tmp_path, monkeypatch):
+    monkeypatch.setattr(build_reports_list, 'REPORTS_DIR', _write_reports(tmp_path, 5))
+    monkeypatch.setattr(build_reports_list, 'FRONTMATTER_CACHE', tmp_path / 'cache.json')
+    monkeypatch.setattr(build_reports_list, '_WORKERS', 3)
+    threaded = build_reports_list.scan_reports()
+    assert [it['id'] for it in threaded] == ['ev00', 'ev01', 'ev02', 'ev03', 'ev04', 'ev99']
+    assert threaded[1] == {
+        'id': 'ev01', 'title': 'Report 1', 'peak': 'Peak 1',
+        'date_of_event': '2024-02-01', 'date': '2024-02-01', 'activity': 'Ski',
+    }
+    assert threaded[-1]['title'] == 'Odd: one'
+
+    monkeypatch.setattr(build_reports_list, '_PROCESS_POOL_MIN', 1)
+    (tmp_path / 'cache.json').unlink()
+    assert build_reports_list.scan_reports() == threaded
+
+
+def test_scan_reports_reuses_cached_items_for_unchanged_files(tmp_path, monkeypatch):
+    d = _write_reports(tmp_path, 3)
+    monkeypatch.setattr(build_reports_list, 'REPORTS_DIR', d)
+    monkeypatch.setattr(build_reports_list, 'FRONTMATTER_CACHE', tmp_path / 'cache.json')
+    first = build_reports_list.scan_reports()
+
+    parsed = []
+    real = build_reports_list._parse_one
+    monkeypatch.setattr(build_reports_list, '_parse_one', lambda p: parsed.append(p.stem) or real(p))
+    assert build_reports_list.scan_reports() == first
+    assert parsed == []
+
+    (d / 'ev01.md').write_text('---\ntitle: Changed title here\n---\n', encoding='utf-8')
+    (d / 'ev02.md').unlink()
+    again = build_reports_list.scan_reports()
+    assert parsed == ['ev01']
+    assert [it['id'] for it in again] == ['ev00', 'ev01', 'ev99']
+    assert again[1]['title'] == 'Changed title here'
+
+
+def test_lenient_loader_splits_once_and_handles_missing_front_matter(tmp_path):
+    p = tmp_path / 'a.md'
+    p.write_bytes(b'---\r\ntitle: "Quoted: title"\r\ndate: 2024-05-01\r\n---\r\n# Body\r\n---\r\nmore\r\n')
+    meta, body = build_reports_list._load_frontmatter_lenient(p)
+    assert meta == {'title': 'Quoted: title', 'date': '2024-05-01'}
+    assert body.splitlines() == ['# Body', '---', 'more']
+
+    p.write_text('# Just a heading\nno front matter\n', encoding='utf-8')
+    meta, body = build_reports_list._load_frontmatter_lenient(p)
+    assert meta == {}
+    assert body.startswith('# Just a heading')
+    assert build_reports_list._parse_one(p)['title'] == 'Just a heading'
+
+
+def test_body_scan_finds_first_labelled_lines(tmp_path):
+    p = tmp_path / 'b.md'
+    p.write_text(
+        '---\ntitle: T\naudience: climbers\n---\n'
+        'Intro\n  * Activity/Style:  Alpine rock \n- Peak/Area - Mount Slesse\nPeak/Area: later\n',
+        encoding='utf-8',
+    )
+    item = build_reports_list._parse_one(p)
+    assert (item['peak'], item['activity']) == ('Mount Slesse', 'Alpine rock')
+
+    p.write_text('---\ntitle: T\npeak: From meta\naudience: climbers\n---\nPeak/Area: body\n', encoding='utf-8')
+    item = build_reports_list._parse_one(p)
+    assert (item['peak'], item['activity']) == ('From meta', 'climbers')
+
+
+def test_upload_manifest_prefers_storage_client(tmp_path, monkeypatch):
+    uploads = []
+
+    class FakeBlob:
+        def __init__(self, name):
+            self.name = name
+
+        def upload_from_filename(self, path, content_type=None):
+            uploads.append((self.name, path, content_type))
+
+    class FakeClient:
+        def bucket(self, name):
+            assert name == 'my-bucket'
+            return type('B', (), {'blob': lambda self, n: FakeBlob(n)})()
+
+    monkeypatch.setattr(build_reports_list, 'GCS_CLIENT_AVAILABLE', True)
+    monkeypatch.setattr(build_reports_list, 'storage', type('S', (), {'Client': FakeClient}))
+    monkeypatch.setattr(build_reports_list.subprocess, 'check_call', lambda *a, **k: pytest.fail('shelled out'))
+    out = tmp_path / 'list.json'
+    out.write_text('[]', encoding='utf-8')
+    build_reports_list._upload_manifest('my-bucket', out)
+    assert uploads == [('reports/list.json', str(out), 'application/json')]
+
+    calls = []
+    monkeypatch.setattr(build_reports_list, 'GCS_CLIENT_AVAILABLE', False)
+    monkeypatch.setattr(build_reports_list.subprocess, 'check_call', lambda cmd: calls.append(cmd))
+    build_reports_list._upload_manifest('my-bucket', out)
+    assert calls == [['gsutil', 'cp', str(out), 'gs://my-bucket/reports/list.json']]
+
+
+def test_upload_manifest_falls_back_to_gsutil_when_client_fails(tmp_path, monkeypatch):
+    class NoCredsClient:
+        def __init__(self):
+            raise RuntimeError('Could not automatically determine credentials')
+
+    calls = []
+    monkeypatch.setattr(build_reports_list, 'GCS_CLIENT_AVAILABLE', True)
+    monkeypatch.setattr(build_reports_list, 'storage', type('S', (), {'Client': NoCredsClient}))
+    monkeypatch.setattr(build_reports_list.subprocess, 'check_call', lambda cmd: calls.append(cmd))
+    out = tmp_path / 'list.json'
+    out.write_text('[]', encoding='utf-8')
+    build_reports_list._upload_manifest('my-bucket', out)
+    assert calls == [['gsutil', 'cp', str(out), 'gs://my-bucket/reports/list.json']]
+
+
+def test_unreadable_report_gets_id_title(tmp_path, monkeypatch):
+    d = tmp_path / 'reports'
+    d.mkdir()
+    (d / 'bad.md').mkdir()  # every read of this "report" fails
+    (d / 'notes.txt').write_text('ignored', encoding='utf-8')
+    monkeypatch.setattr(build_reports_list, 'REPORTS_DIR', d)
+    monkeypatch.setattr(build_reports_list, 'FRONTMATTER_CACHE', tmp_path / 'cache.json')
+    assert build_reports_list._parse_one(d / 'bad.md') == {'id': 'bad', 'title': 'bad'}
+    # only regular *.md files are listed
+    assert build_reports_list.scan_reports() == []
+
+
+def test_title_falls_back_to_first_heading(tmp_path):
+    p = tmp_path / 'c.md'
+    p.write_text('---\naudience: climbers\n---\nintro line\n\n  ## Avalanche on Joffre \nmore\n# Later\n', encoding='utf-8')
+    assert build_reports_list._parse_one(p)['title'] == 'Avalanche on Joffre'
+    p.write_text('---\naudience: climbers\n---\nno headings here\n', encoding='utf-8')
+    assert build_reports_list._parse_one(p)['title'] == 'c'
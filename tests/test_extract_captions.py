@@ -0,0 +1,51 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import extract_captions
+
+
+def test_irrelevant_token_matching():
+    assert extract_captions.contains_irrelevant_token('Station LOGO on a truck')
+    assert extract_captions.contains_irrelevant_token('share-icons.png')
+    assert not extract_captions.contains_irrelevant_token('Rescue helicopter over the glacier')
+    assert not extract_captions.contains_irrelevant_token(None)
+    assert extract_captions.is_stray_url('https://cdn.example.com/img/site-favicon.png')
+    assert not extract_captions.is_stray_url('https://example.com/media/ridge.jpg')
+
+
+def test_preprocess_image_binarizes(monkeypatch):
+    from PIL import Image
+
+    monkeypatch.setenv('OCR_MAX_WIDTH', '64')
+    monkeypatch.setenv('OCR_THRESHOLD', '100')
+    img = Image.new('RGB', (32, 16), (0, 0, 0))
+    img.paste((200, 200, 200), (0, 0, 16, 16))
+    out = extract_captions.preprocess_image(img)
+    assert out.size == (64, 32)
+    assert {value for _count, value in out.getcolors()} <= {0, 255}
+    assert out.getpixel((5, 5)) == 255 and out.getpixel((60, 5)) == 0
+
+
+def test_ocr_reuses_one_tesseract_handle(monkeypatch):
+    from PIL import Image
+
+    created = []
+
+    class FakeAPI:
+        def __init__(self):
+            created.append(self)
+
+        def SetImage(self, img):
+            self.size = img.size
+
+        def GetUTF8Text(self):
+            return f' text {self.size[0]}\n'
+
+    monkeypatch.setattr(extract_captions, '_HAS_TESSEROCR', True)
+    monkeypatch.setattr(extract_captions, 'PyTessBaseAPI', FakeAPI)
+    monkeypatch.setattr(extract_captions, '_TESS_API', None)
+    assert extract_captions.ocr_image_to_string(Image.new('L', (10, 5))) == 'text 10'
+    assert extract_captions.ocr_image_to_string(Image.new('L', (20, 5))) == 'text 20'
+    assert len(created) == 1
@@ -0,0 +1,76 @@
+import sys
+import types
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import fetcher
+
+
+class _FakeResp:
+    def __init__(self, text, url='https://example.com/story', status_code=200):
+        self.text = text
+        self.url = url
+        self.status_code = status_code
+
+
+STORY = (
+    'A climber fell roughly thirty metres near the summit ridge on Saturday afternoon. '
+    'The RCMP said search and rescue crews recovered the body later that evening. '
+)
+
+HTML_NO_ARTICLE = f'''
+<html><body>
+<div class="nav"><p>Home News Sports Weather Opinion Obituaries Contact us today</p></div>
+<div class="story">
+  <p>{STORY}</p>
+  <p>Friends described the climber as experienced and careful on technical terrain.</p>
+  <p>The BC Coroners Service is investigating the death, according to officials.</p>
+</div>
+<div class="footer"><p>Copyright notice and other footer text that is long enough.</p></div>
+</body></html>
+'''
+
+
+def _patch_fetch(monkeypatch, html):
+    monkeypatch.setattr(fetcher, 'get_with_retries', lambda url, timeout=25, headers=None: _FakeResp(html, url=url))
+
+
+def test_fallback_container_prefers_densest_div(monkeypatch):
+    _patch_fetch(monkeypatch, HTML_NO_ARTICLE)
+    full, focused, final_url = fetcher.extract_article_text('https://example.com/story')
+    assert final_url == 'https://example.com/story'
+    assert 'climber fell' in full
+    assert 'Coroners Service' in full
+    assert 'Obituaries' not in full
+    assert 'climber fell' in focused
+
+
+def test_static_body_with_anchor_signal_skips_playwright(monkeypatch):
+    launched = []
+    fake_mod = types.ModuleType('playwright.sync_api')
+    fake_mod.sync_playwright = lambda: launched.append(True)
+    monkeypatch.setitem(sys.modules, 'playwright.sync_api', fake_mod)
+
+    def _no_network(*a, **k):
+        raise RuntimeError('network disabled in tests')
+    monkeypatch.setattr(fetcher.requests, 'get', _no_network)
+
+    html = '<html><body><article>' + f'<p>{STORY}</p>' * 8 + '</article></body></html>'
+    monkeypatch.setattr(fetcher, 'get_with_retries', lambda url, timeout=25, headers=None: _FakeResp(html, url=url, status_code=403))
+    full, _focused, _url = fetcher.extract_article_text('https://example.com/story')
+    assert launched == []
+    assert 'RCMP' in full
+
+
+def test_extract_many_keeps_order_and_isolates_failures():
+    def fake_extract(u):
+        if u.endswith('/bad'):
+            raise RuntimeError('boom')
+        return (f'full {u}', f'focused {u}', u)
+
+    urls = [f'https://example.com/{i}' for i in range(6)] + ['https://example.com/bad']
+    out = fetcher.extract_many(urls, max_workers=3, extract=fake_extract)
+    assert [r[2] for r in out] == urls
+    assert out[0] == ('full https://example.com/0', 'focused https://example.com/0', 'https://example.com/0')
+    assert out[-1] == ('', '', 'https://example.com/bad')
@@ -0,0 +1,616 @@
+import json
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import image_ocr
+
+
+def _write_captions(tmp_path, n):
+    entries = []
+    for i in range(n):
+        img = tmp_path / f'img{i}.jpg'
+        img.write_bytes(f'fake{i}'.encode())
+        entries.append({'image_url': f'https://example.com/{i}.jpg', 'local_image_path': str(img)})
+    entries.append({'image_url': 'https://example.com/missing.jpg', 'local_image_path': str(tmp_path / 'missing.jpg')})
+    p = tmp_path / 'captions.json'
+    p.write_text(json.dumps(entries), encoding='utf-8')
+    return p
+
+
+def test_enrich_assigns_results_to_matching_entries(tmp_path, monkeypatch):
+    p = _write_captions(tmp_path, 5)
+    monkeypatch.setattr(image_ocr, 'OCR_SCREEN_IMAGES', False)
+    monkeypatch.setattr(image_ocr, 'analyze_conditions', lambda path, size=None, digest=None: {
+        'ocr': {'model': 'fake', 'summary': Path(path).name},
+        'mountaineering_extras': {},
+    })
+    image_ocr.enrich_json_with_conditions(str(p))
+    data = json.loads(p.read_text(encoding='utf-8'))
+    for i in range(5):
+        assert data[i]['ocr']['summary'] == f'img{i}.jpg'
+    assert 'ocr' not in data[5]
+
+
+def test_encode_downscales_large_images(tmp_path, monkeypatch):
+    import base64
+    import io
+    from PIL import Image
+
+    monkeypatch.setattr(image_ocr, 'OCR_MAX_EDGE', 256)
+    big = tmp_path / 'big.png'
+    Image.new('RGB', (1200, 600), (120, 140, 160)).save(big)
+    url = image_ocr._encode_image_as_data_url(str(big))
+    assert url.startswith('data:image/webp;base64,')
+    with Image.open(io.BytesIO(base64.b64decode(url.split(',', 1)[1]))) as im:
+        assert im.format == 'WEBP'
+        assert im.size == (256, 128)
+
+    monkeypatch.setattr(image_ocr, 'OCR_RECODE_FORMAT', 'jpeg')
+    url = image_ocr._encode_image_as_data_url(str(big))
+    assert url.startswith('data:image/jpeg;base64,')
+    with Image.open(io.BytesIO(base64.b64decode(url.split(',', 1)[1]))) as im:
+        assert im.size == (256, 128)
+
+    monkeypatch.setattr(image_ocr, 'OCR_MAX_EDGE', 1024)
+    url = image_ocr._encode_image_as_data_url(str(big), detail='low')
+    with Image.open(io.BytesIO(base64.b64decode(url.split(',', 1)[1]))) as im:
+        assert im.size == (512, 256)
+    url = image_ocr._encode_image_as_data_url(str(big), detail='high')
+    with Image.open(io.BytesIO(base64.b64decode(url.split(',', 1)[1]))) as im:
+        assert im.size == (1024, 512)
+
+    small = tmp_path / 'small.png'
+    Image.new('RGB', (100, 80)).save(small)
+    url = image_ocr._encode_image_as_data_url(str(small))
+    assert url == 'data:image/png;base64,' + base64.b64encode(small.read_bytes()).decode('ascii')
+
+
+def test_encode_streams_multi_chunk_files(tmp_path):
+    import base64
+    import os
+
+    raw = tmp_path / 'blob.jpg'
+    raw.write_bytes(os.urandom(3 * image_ocr._B64_CHUNK + 11))
+    url = image_ocr._encode_image_as_data_url(str(raw))
+    assert url == 'data:image/jpg;base64,' + base64.b64encode(raw.read_bytes()).decode('ascii')
+
+
+def test_screening_skips_small_and_decorative_images(tmp_path, monkeypatch):
+    from PIL import Image
+
+    monkeypatch.setattr(image_ocr, 'MIN_IMG_BYTES', 0)
+    seen = []
+    monkeypatch.setattr(image_ocr, 'analyze_conditions', lambda path, size=None, digest=None: seen.append((Path(path).name, size)) or {
+        'ocr': {'model': 'fake'}, 'mountaineering_extras': {},
+    })
+    entries = []
+    for name, dims, caption in [
+        ('photo.png', (640, 480), 'Rescue helicopter on the ridge'),
+        ('tiny.png', (120, 80), 'Crew at the trailhead'),
+        ('brand.png', (640, 480), 'Station logo'),
+    ]:
+        img = tmp_path / name
+        Image.new('RGB', dims).save(img)
+        entries.append({'local_image_path': str(img), 'caption_clean': caption})
+    p = tmp_path / 'captions.json'
+    p.write_text(json.dumps(entries), encoding='utf-8')
+
+    image_ocr.enrich_json_with_conditions(str(p))
+    assert seen == [('photo.png', (640, 480))]
+    data = json.loads(p.read_text(encoding='utf-8'))
+    assert [('ocr' in e) for e in data] == [True, False, False]
+
+
+def _fake_vision(calls):
+    def _chat(client, model, image_data_url, detail='low'):
+        calls.append(image_data_url)
+        return json.dumps({'ocr': {'summary': 'snowy ridge', 'signals': {}, 'confidence': 0.8}, 'mountaineering_extras': {}})
+    return _chat
+
+
+def test_analyze_conditions_caches_by_image_content(tmp_path, monkeypatch):
+    from PIL import Image
+
+    monkeypatch.setenv('OPENAI_API_KEY', 'sk-test')
+    monkeypatch.setattr(image_ocr, 'OCR_CACHE_DIR', tmp_path / 'cache')
+    monkeypatch.setattr(image_ocr, 'OCR_CACHE_ENABLED', True)
+    monkeypatch.setattr(image_ocr, 'try_reserve', lambda n=1: True)
+    monkeypatch.setattr(image_ocr, 'OCR_SCREEN_IMAGES', False)
+    calls = []
+    monkeypatch.setattr(image_ocr, '_chat_vision_json', _fake_vision(calls))
+
+    a = tmp_path / 'a.png'
+    Image.new('RGB', (64, 64), (10, 20, 30)).save(a)
+    b = tmp_path / 'copy_of_a.png'
+    b.write_bytes(a.read_bytes())
+
+    first = image_ocr.analyze_conditions(str(a))
+    second = image_ocr.analyze_conditions(str(b))
+    assert first == second
+    assert first['ocr']['summary'] == 'snowy ridge'
+    assert len(calls) == 1
+
+
+class _FakeBatchClient:
+    """Minimal stand-in for the files/batches endpoints used by the batch path."""
+
+    def __init__(self):
+        self.uploaded = None
+        self.retrievals = 0
+        outer = self
+
+        class _Files:
+            def create(self, file, purpose):
+                assert purpose == 'batch'
+                outer.uploaded = file[1].decode('utf-8')
+                return type('F', (), {'id': 'file-in'})()
+
+            def content(self, file_id):
+                assert file_id == 'file-out'
+                lines = []
+                for line in outer.uploaded.splitlines():
+                    req = json.loads(line)
+                    reply = {'ocr': {'summary': f"entry {req['custom_id']}", 'signals': {}, 'confidence': 0.5},
+                             'mountaineering_extras': {}}
+                    lines.append(json.dumps({
+                        'custom_id': req['custom_id'],
+                        'response': {'body': {'choices': [{'message': {'content': json.dumps(reply)}}]}},
+                    }))
+                return type('C', (), {'text': '\n'.join(lines)})()
+
+        class _Batches:
+            def create(self, input_file_id, endpoint, completion_window):
+                assert (input_file_id, endpoint, completion_window) == ('file-in', '/v1/chat/completions', '24h')
+                return type('B', (), {'id': 'batch-1', 'status': 'validating', 'output_file_id': None})()
+
+            def retrieve(self, batch_id):
+                outer.retrievals += 1
+                return type('B', (), {'id': batch_id, 'status': 'completed', 'output_file_id': 'file-out'})()
+
+        self.files = _Files()
+        self.batches = _Batches()
+
+
+def test_batch_enrichment_merges_results_by_custom_id(tmp_path, monkeypatch):
+    from PIL import Image
+
+    monkeypatch.setenv('OPENAI_API_KEY', 'sk-test')
+    monkeypatch.setattr(image_ocr, 'OCR_CACHE_ENABLED', False)
+    monkeypatch.setattr(image_ocr, 'OCR_SCREEN_IMAGES', False)
+    monkeypatch.setattr(image_ocr, 'remaining', lambda: None)
+    monkeypatch.setattr(image_ocr, 'try_reserve', lambda n=1: True)
+    fake = _FakeBatchClient()
+    monkeypatch.setattr(image_ocr, '_get_client', lambda: fake)
+
+    entries = []
+    for i in range(3):
+        img = tmp_path / f'img{i}.png'
+        Image.new('RGB', (32, 32), (i, i, i)).save(img)
+        entries.append({'local_image_path': str(img)})
+    entries.insert(1, {'image_url': 'https://example.com/no-local.jpg'})
+    p = tmp_path / 'captions.json'
+    p.write_text(json.dumps(entries), encoding='utf-8')
+
+    image_ocr.enrich_json_with_conditions_batch(str(p), poll_interval=0)
+    data = json.loads(p.read_text(encoding='utf-8'))
+    assert len(fake.uploaded.splitlines()) == 3
+    assert fake.retrievals == 1
+    assert [e.get('ocr', {}).get('summary') for e in data] == ['entry 0', None, 'entry 2', 'entry 3']
+
+
+def test_batch_enrichment_stays_within_call_cap(tmp_path, monkeypatch):
+    import importlib
+    from PIL import Image
+
+    monkeypatch.setenv('OPENAI_CALLS_PATH', str(tmp_path / '.calls.json'))
+    monkeypatch.setenv('MAX_OPENAI_CALLS', '3')
+    cm = importlib.reload(importlib.import_module('openai_call_manager'))
+    monkeypatch.setattr(image_ocr, 'try_reserve', cm.try_reserve)
+    monkeypatch.setattr(image_ocr, 'remaining', cm.remaining)
+    monkeypatch.setattr(image_ocr, 'release', cm.release)
+    monkeypatch.setenv('OPENAI_API_KEY', 'sk-test')
+    monkeypatch.setattr(image_ocr, 'OCR_CACHE_ENABLED', False)
+    monkeypatch.setattr(image_ocr, 'OCR_SCREEN_IMAGES', False)
+    sync_calls = []
+    monkeypatch.setattr(image_ocr, '_chat_vision_json', lambda *a, **k: sync_calls.append(1) or '{}')
+    fake = _FakeBatchClient()
+    monkeypatch.setattr(image_ocr, '_get_client', lambda: fake)
+
+    entries = []
+    for i in range(5):
+        img = tmp_path / f'img{i}.png'
+        Image.new('RGB', (32, 32), (i, i, i)).save(img)
+        entries.append({'local_image_path': str(img)})
+    p = tmp_path / 'captions.json'
+    p.write_text(json.dumps(entries), encoding='utf-8')
+
+    image_ocr.enrich_json_with_conditions_batch(str(p), poll_interval=0)
+    assert sync_calls == []
+    assert len(fake.uploaded.splitlines()) == 3
+    assert cm.remaining() == 0
+    data = json.loads(p.read_text(encoding='utf-8'))
+    assert [e['ocr']['summary'] for e in data] == ['entry 0', 'entry 1', 'entry 2', None, None]
+
+
+def test_enrich_skips_entries_annotated_from_identical_bytes(tmp_path, monkeypatch):
+    monkeypatch.setattr(image_ocr, 'OCR_SCREEN_IMAGES', False)
+    calls = []
+
+    def fake_analyze(path, size=None, digest=None):
+        calls.append(Path(path).name)
+        return {'ocr': {'model': 'fake', 'summary': 'ok', 'confidence': 0.7}, 'mountaineering_extras': {}}
+    monkeypatch.setattr(image_ocr, 'analyze_conditions', fake_analyze)
+
+    p = _write_captions(tmp_path, 3)
+    image_ocr.enrich_json_with_conditions(str(p))
+    assert len(calls) == 3
+    data = json.loads(p.read_text(encoding='utf-8'))
+    assert data[0]['ocr']['image_hash'] == image_ocr._bytes_digest(Path(data[0]['local_image_path']).read_bytes())
+
+    # second run: only the image whose bytes changed is re-analysed
+    Path(data[1]['local_image_path']).write_bytes(b'changed')
+    calls.clear()
+    image_ocr.enrich_json_with_conditions(str(p))
+    assert calls == ['img1.jpg']
+
+
+def test_enrich_resumes_from_partial_log(tmp_path, monkeypatch):
+    monkeypatch.setattr(image_ocr, 'OCR_SCREEN_IMAGES', False)
+    p = _write_captions(tmp_path, 3)
+    partial = tmp_path / 'captions.json.partial.jsonl'
+    partial.write_text(
+        json.dumps({'idx': 1, 'ocr': {'summary': 'from log'}, 'mountaineering_extras': {}}) + '\n' + '{"idx": 2, "oc',
+        encoding='utf-8',
+    )
+    calls = []
+
+    def fake_analyze(path, size=None, digest=None):
+        calls.append(Path(path).name)
+        return {'ocr': {'summary': 'fresh'}, 'mountaineering_extras': {}}
+    monkeypatch.setattr(image_ocr, 'analyze_conditions', fake_analyze)
+
+    image_ocr.enrich_json_with_conditions(str(p))
+    assert sorted(calls) == ['img0.jpg', 'img2.jpg']
+    data = json.loads(p.read_text(encoding='utf-8'))
+    assert [e.get('ocr', {}).get('summary') for e in data] == ['fresh', 'from log', 'fresh', None]
+    assert not partial.exists()
+
+
+def test_partial_log_lines_must_match_current_entries(tmp_path, monkeypatch):
+    monkeypatch.setattr(image_ocr, 'OCR_SCREEN_IMAGES', False)
+    p = _write_captions(tmp_path, 3)
+    data = json.loads(p.read_text(encoding='utf-8'))
+    paths = [e['local_image_path'] for e in data[:3]]
+    good_hash = image_ocr._bytes_digest(Path(paths[0]).read_bytes())
+    partial = tmp_path / 'captions.json.partial.jsonl'
+    partial.write_text('\n'.join(json.dumps(r) for r in [
+        {'idx': 0, 'local_image_path': paths[0], 'image_hash': good_hash, 'ocr': {'summary': 'kept'}},
+        {'idx': 1, 'local_image_path': paths[2], 'image_hash': None, 'ocr': {'summary': 'moved'}},
+        {'idx': 2, 'local_image_path': paths[2], 'image_hash': 'not-these-bytes', 'ocr': {'summary': 'changed'}},
+    ]) + '\n', encoding='utf-8')
+    calls = []
+    monkeypatch.setattr(image_ocr, 'analyze_conditions', lambda path, size=None, digest=None: calls.append(
+        Path(path).name) or {'ocr': {'summary': 'fresh'}, 'mountaineering_extras': {}})
+
+    image_ocr.enrich_json_with_conditions(str(p))
+    assert sorted(calls) == ['img1.jpg', 'img2.jpg']
+    summaries = [e.get('ocr', {}).get('summary') for e in json.loads(p.read_text(encoding='utf-8'))]
+    assert summaries[:3] == ['kept', 'fresh', 'fresh']
+
+    # a sidecar older than its JSON is from a previous version of the file
+    partial.write_text(json.dumps({'idx': 0, 'ocr': {'summary': 'stale'}}) + '\n', encoding='utf-8')
+    os.utime(partial, (1_000, 1_000))
+    assert image_ocr._replay_partial(partial, data, p) == set()
+
+
+def test_adaptive_detail_buckets_by_downscaled_area(monkeypatch):
+    monkeypatch.setattr(image_ocr, 'OCR_IMAGE_DETAIL', 'adaptive')
+    monkeypatch.setattr(image_ocr, 'OCR_MAX_EDGE', 1024)
+    assert image_ocr._detail_for((640, 480)) == 'low'
+    assert image_ocr._detail_for((4000, 3000)) == 'high'
+    assert image_ocr._detail_for((4000, 400)) == 'low'
+    assert image_ocr._detail_for(None) == 'auto'
+    monkeypatch.setattr(image_ocr, 'OCR_IMAGE_DETAIL', 'low')
+    assert image_ocr._detail_for((4000, 3000)) == 'low'
+
+
+def test_enrich_analyses_identical_images_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(image_ocr, 'OCR_SCREEN_IMAGES', False)
+    calls = []
+
+    def fake_analyze(path, size=None, digest=None):
+        calls.append(Path(path).name)
+        return {'ocr': {'summary': 'shared'}, 'mountaineering_extras': {}}
+    monkeypatch.setattr(image_ocr, 'analyze_conditions', fake_analyze)
+
+    p = _write_captions(tmp_path, 4)
+    for i in range(4):
+        (tmp_path / f'img{i}.jpg').write_bytes(b'same bytes')
+    image_ocr.enrich_json_with_conditions(str(p))
+    assert len(calls) == 1
+    data = json.loads(p.read_text(encoding='utf-8'))
+    assert [e.get('ocr', {}).get('summary') for e in data] == ['shared'] * 4 + [None]
+
+
+def test_result_schema_matches_scaffold_shape(tmp_path, monkeypatch):
+    monkeypatch.delenv('OPENAI_API_KEY', raising=False)
+    monkeypatch.setattr(image_ocr, 'OCR_CACHE_ENABLED', False)
+    img = tmp_path / 'a.jpg'
+    img.write_bytes(b'x')
+    scaffold = image_ocr.analyze_conditions(str(img))
+
+    def check(schema, value):
+        if schema.get('type') == 'object':
+            assert schema['required'] == list(schema['properties'])
+            assert schema['additionalProperties'] is False
+            assert set(schema['properties']) == set(value)
+            for k, sub in schema['properties'].items():
+                check(sub, value[k])
+    check(image_ocr._RESULT_SCHEMA, scaffold)
+
+
+def test_image_size_falls_back_to_pil(tmp_path, monkeypatch):
+    from PIL import Image
+
+    img = tmp_path / 'a.png'
+    Image.new('RGB', (321, 123)).save(img)
+    assert image_ocr._image_size(str(img)) == (321, 123)
+    monkeypatch.setattr(image_ocr, '_HAS_IMAGESIZE', False)
+    assert image_ocr._image_size(str(img)) == (321, 123)
+
+
+def test_small_images_route_to_small_model(monkeypatch):
+    monkeypatch.setattr(image_ocr, 'OCR_MAX_EDGE', 1024)
+    monkeypatch.setenv('OCR_VISION_MODEL', 'big-model')
+    monkeypatch.delenv('OCR_VISION_MODEL_SMALL', raising=False)
+    assert image_ocr._model_for((640, 480)) == 'big-model'
+    monkeypatch.setenv('OCR_VISION_MODEL_SMALL', 'small-model')
+    assert image_ocr._model_for((640, 480)) == 'small-model'
+    assert image_ocr._model_for((4000, 3000)) == 'big-model'
+    assert image_ocr._model_for(None) == 'big-model'
+
+
+def test_analyze_conditions_skips_irrelevant_images_before_any_work(tmp_path, monkeypatch):
+    from PIL import Image
+
+    monkeypatch.setenv('OPENAI_API_KEY', 'sk-test')
+    monkeypatch.setattr(image_ocr, 'try_reserve', lambda n=1: True)
+
+    def _unexpected(*args, **kwargs):
+        raise AssertionError('screened-out image should not be hashed or sent')
+    monkeypatch.setattr(image_ocr, '_bytes_digest', _unexpected)
+    monkeypatch.setattr(image_ocr, '_chat_vision_json', _unexpected)
+    favicon = tmp_path / 'favicon.png'
+    Image.new('RGB', (48, 48)).save(favicon)
+    result = image_ocr.analyze_conditions(str(favicon))
+    assert result == image_ocr._empty_result()
+
+
+def test_encode_from_preread_bytes_matches_file(tmp_path):
+    from PIL import Image
+
+    big = tmp_path / 'big.jpg'
+    Image.new('RGB', (1600, 900), (90, 120, 150)).save(big)
+    raw = big.read_bytes()
+    assert image_ocr._encode_image_as_data_url(str(big), raw=raw) == image_ocr._encode_image_as_data_url(str(big))
+    small = tmp_path / 'small.png'
+    Image.new('RGB', (100, 80)).save(small)
+    assert image_ocr._encode_image_as_data_url(str(small), raw=small.read_bytes()) == image_ocr._encode_image_as_data_url(str(small))
+
+
+def test_coerce_result_extracts_first_balanced_object():
+    content = 'Here you go: {"ocr": {"summary": "a } in text", "confidence": 0.4}} and {"other": 1}'
+    obj, parsed = image_ocr._coerce_result(content, 'm')
+    assert parsed
+    assert obj['ocr']['summary'] == 'a } in text'
+    assert obj['ocr']['model'] == 'm'
+    obj, parsed = image_ocr._coerce_result('no json here {', 'm')
+    assert not parsed
+    assert obj['ocr']['confidence'] == 0.0
+
+
+def test_enrich_packs_several_images_per_call(tmp_path, monkeypatch):
+    from PIL import Image
+
+    entries = []
+    for i in range(5):
+        img = tmp_path / f'img{i}.png'
+        Image.new('RGB', (40, 30), (i * 40, 0, 0)).save(img)
+        entries.append({'local_image_path': str(img)})
+    p = tmp_path / 'captions.json'
+    p.write_text(json.dumps(entries), encoding='utf-8')
+    monkeypatch.setenv('OPENAI_API_KEY', 'sk-test')
+    monkeypatch.setattr(image_ocr, 'OCR_IMAGES_PER_CALL', 2)
+    monkeypatch.setattr(image_ocr, 'OCR_SCREEN_IMAGES', False)
+    monkeypatch.setattr(image_ocr, 'OCR_CACHE_ENABLED', False)
+    monkeypatch.setattr(image_ocr, 'try_reserve', lambda n=1: True)
+    monkeypatch.setattr(image_ocr, '_get_client', lambda: object())
+    single = []
+    monkeypatch.setattr(image_ocr, '_chat_vision_json', _fake_vision(single))
+    multi = []
+
+    def _chat_multi(client, model, image_data_urls, detail='low'):
+        multi.append(len(image_data_urls))
+        if len(multi) == 1:
+            return 'not json'
+        return json.dumps({'results': [{'ocr': {'summary': f'multi {k}'}} for k in range(len(image_data_urls))]})
+    monkeypatch.setattr(image_ocr, '_chat_vision_json_multi', _chat_multi)
+
+    image_ocr.enrich_json_with_conditions(str(p))
+    data = json.loads(p.read_text(encoding='utf-8'))
+    assert multi == [2, 2]
+    # one unparseable pair plus the odd image out go one per call
+    assert len(single) == 3
+    summaries = [e['ocr']['summary'] for e in data]
+    assert summaries.count('snowy ridge') == 3
+    assert sorted(s for s in summaries if s.startswith('multi')) == ['multi 0', 'multi 1']
+
+
+def test_zero_confidence_results_are_not_cached(tmp_path, monkeypatch):
+    monkeypatch.setattr(image_ocr, 'OCR_CACHE_DIR', tmp_path / 'cache')
+    monkeypatch.setattr(image_ocr, 'OCR_CACHE_ENABLED', True)
+    image_ocr._cache_put('k0', {'ocr': {'confidence': 0.0}, 'mountaineering_extras': {}})
+    assert image_ocr._cache_get('k0') is None
+    image_ocr._cache_put('k1', {'ocr': {'confidence': 0.6}, 'mountaineering_extras': {}})
+    assert image_ocr._cache_get('k1')['ocr']['confidence'] == 0.6
+
+
+def test_hosted_image_url_replaces_data_url_under_root(tmp_path, monkeypatch):
+    monkeypatch.setattr(image_ocr, 'OCR_IMAGE_URL_BASE', 'https://img.example.com/artifacts')
+    monkeypatch.setattr(image_ocr, 'OCR_IMAGE_ROOT', str(tmp_path))
+    img = tmp_path / 'a b' / 'ridge.jpg'
+    img.parent.mkdir()
+    img.write_bytes(b'not decoded')
+    assert image_ocr._image_url(str(img)) == 'https://img.example.com/artifacts/a%20b/ridge.jpg'
+    outside = tmp_path.parent / 'elsewhere.jpg'
+    assert image_ocr._hosted_image_url(str(outside)) is None
+    assert image_ocr._hosted_image_url(str(tmp_path / 'anim.gif')) is None
+    monkeypatch.setattr(image_ocr, 'OCR_IMAGE_URL_BASE', '')
+    assert image_ocr._hosted_image_url(str(img)) is None
+
+
+def test_analyze_conditions_screens_from_the_bytes_it_read(tmp_path, monkeypatch):
+    from PIL import Image
+
+    monkeypatch.delenv('OPENAI_API_KEY', raising=False)
+    monkeypatch.setattr(image_ocr, 'OCR_CACHE_ENABLED', False)
+    monkeypatch.setattr(image_ocr, 'MIN_IMG_BYTES', 0)
+
+    def _no_stat(*args, **kwargs):
+        raise AssertionError('size should come from the bytes already read')
+    monkeypatch.setattr(image_ocr.os.path, 'getsize', _no_stat)
+    img = tmp_path / 'ridge.png'
+    Image.new('RGB', (640, 480)).save(img)
+    assert image_ocr.analyze_conditions(str(img)) == image_ocr._empty_result()
+
+
+def test_strict_mode_drops_schema_text_from_prompt(monkeypatch):
+    monkeypatch.setattr(image_ocr, 'OCR_STRICT_SCHEMA', True)
+    system = image_ocr._vision_messages('data:x', 'low')[0]['content']
+    assert system == image_ocr._STRICT_PROMPT
+    assert image_ocr._request_options()['response_format']['json_schema']['strict'] is True
+    monkeypatch.setattr(image_ocr, 'OCR_STRICT_SCHEMA', False)
+    assert image_ocr._vision_messages('data:x', 'low')[0]['content'] == image_ocr._SCHEMA_PROMPT
+    assert image_ocr._request_options() == {}
+
+
+def test_unparseable_reply_uses_the_shared_scaffold():
+    obj, parsed = image_ocr._coerce_result('sorry, no JSON', 'gpt-x')
+    assert not parsed
+    expected = image_ocr._empty_result()
+    expected['ocr']['model'] = 'gpt-x'
+    assert obj == expected
+
+
+def test_enrich_skips_untagged_results_unless_forced(tmp_path, monkeypatch):
+    monkeypatch.setattr(image_ocr, 'OCR_SCREEN_IMAGES', False)
+    calls = []
+
+    def fake_analyze(path, size=None, digest=None):
+        calls.append(Path(path).name)
+        return {'ocr': {'model': 'fake', 'summary': 'new', 'confidence': 0.7}, 'mountaineering_extras': {}}
+    monkeypatch.setattr(image_ocr, 'analyze_conditions', fake_analyze)
+
+    p = _write_captions(tmp_path, 3)
+    data = json.loads(p.read_text(encoding='utf-8'))
+    data[0]['ocr'] = {'model': 'old', 'summary': 'kept', 'confidence': 0.5}
+    data[1]['ocr'] = {'model': 'old', 'summary': None, 'confidence': 0.0}
+    p.write_text(json.dumps(data), encoding='utf-8')
+
+    image_ocr.enrich_json_with_conditions(str(p))
+    assert sorted(calls) == ['img1.jpg', 'img2.jpg']
+    assert json.loads(p.read_text(encoding='utf-8'))[0]['ocr']['summary'] == 'kept'
+
+    calls.clear()
+    monkeypatch.setattr(image_ocr, 'OCR_FORCE_REDO', True)
+    image_ocr.enrich_json_with_conditions(str(p))
+    assert sorted(calls) == ['img0.jpg', 'img1.jpg', 'img2.jpg']
+
+
+def test_enrich_redoes_non_dict_ocr_values(tmp_path, monkeypatch):
+    monkeypatch.setattr(image_ocr, 'OCR_SCREEN_IMAGES', False)
+    calls = []
+    monkeypatch.setattr(image_ocr, 'analyze_conditions', lambda path, size=None, digest=None: calls.append(
+        Path(path).name) or {'ocr': {'model': 'fake', 'confidence': 0.5}, 'mountaineering_extras': {}})
+    p = _write_captions(tmp_path, 2)
+    data = json.loads(p.read_text(encoding='utf-8'))
+    data[0]['ocr'] = 'free text from a non-strict reply'
+    data[1]['ocr'] = ['unexpected']
+    p.write_text(json.dumps(data), encoding='utf-8')
+    image_ocr.enrich_json_with_conditions(str(p))
+    assert sorted(calls) == ['img0.jpg', 'img1.jpg']
+
+
+def test_enrich_leaves_up_to_date_file_untouched(tmp_path, monkeypatch):
+    monkeypatch.setattr(image_ocr, 'OCR_SCREEN_IMAGES', False)
+    monkeypatch.setattr(image_ocr, 'analyze_conditions', lambda *a, **k: {
+        'ocr': {'model': 'fake', 'summary': 's', 'confidence': 0.7}, 'mountaineering_extras': {}})
+    p = _write_captions(tmp_path, 2)
+    image_ocr.enrich_json_with_conditions(str(p))
+    before = p.read_bytes()
+    os.utime(p, (1_000, 1_000))
+
+    monkeypatch.setattr(image_ocr, 'analyze_conditions', lambda *a, **k: pytest.fail('re-analysed'))
+    image_ocr.enrich_json_with_conditions(str(p))
+    assert p.stat().st_mtime == 1_000
+    assert p.read_bytes() == before
+
+
+def test_b64_stream_handles_short_reads():
+    import base64
+
+    class Trickle:
+        def __init__(self, data):
+            self.data = data
+
+        def read(self, n):
+            # a raw stream may return fewer bytes than asked for
+            out, self.data = self.data[:min(n, 1000)], self.data[min(n, 1000):]
+            return out
+
+    payload = bytes(range(256)) * 700
+    out = image_ocr._b64_stream(Trickle(payload), b'data:image/png;base64,')
+    assert out == 'data:image/png;base64,' + base64.b64encode(payload).decode('ascii')
+
+
+def test_adaptive_detail_is_never_sent_to_the_api(monkeypatch):
+    monkeypatch.setattr(image_ocr, 'OCR_IMAGE_DETAIL', 'adaptive')
+    sent = []
+    monkeypatch.setattr(image_ocr, '_chat_json', lambda client, model, messages, detail, n_images=1: sent.append(
+        (detail, [b['image_url']['detail'] for b in messages[-1]['content'] if b['type'] == 'image_url'])) or '{}')
+    image_ocr._chat_vision_json(object(), 'gpt-x', 'data:image/png;base64,AA')
+    image_ocr._chat_vision_json_multi(object(), 'gpt-x', ['u1', 'u2'])
+    image_ocr._chat_vision_json(object(), 'gpt-x', 'u3', 'high')
+    assert sent == [('auto', ['auto']), ('auto', ['auto', 'auto']), ('high', ['high'])]
+    assert image_ocr._vision_messages('u')[-1]['content'][0]['image_url']['detail'] == 'auto'
+
+
+def test_null_model_reply_is_skipped_on_rerun(tmp_path, monkeypatch):
+    monkeypatch.setenv('OPENAI_API_KEY', 'sk-test')
+    monkeypatch.setattr(image_ocr, 'OCR_SCREEN_IMAGES', False)
+    monkeypatch.setattr(image_ocr, 'OCR_CACHE_ENABLED', False)
+    monkeypatch.setattr(image_ocr, 'try_reserve', lambda n=1: True)
+    monkeypatch.setattr(image_ocr, '_get_client', lambda: object())
+    calls = []
+
+    def _chat(client, model, image_data_url, detail=None):
+        calls.append(image_data_url)
+        return json.dumps({'ocr': {'model': None, 'summary': 'ridge', 'signals': {}, 'confidence': 0.8},
+                           'mountaineering_extras': {}})
+    monkeypatch.setattr(image_ocr, '_chat_vision_json', _chat)
+
+    obj, parsed = image_ocr._coerce_result(_chat(None, 'gpt-x', 'u'), 'gpt-x')
+    assert parsed and obj['ocr']['model'] == 'gpt-x'
+    calls.clear()
+
+    p = _write_captions(tmp_path, 2)
+    image_ocr.enrich_json_with_conditions(str(p))
+    assert len(calls) == 2
+    calls.clear()
+    image_ocr.enrich_json_with_conditions(str(p))
+    assert calls == []
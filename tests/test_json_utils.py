@@ -0,0 +1,22 @@
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import json_utils
+
+
+def test_write_json_matches_stdlib_layout(tmp_path):
+    data = {'b': [1, 2.5, None], 'a': {'name': 'Mont Blanc — été'}}
+    p = tmp_path / 'cache.json'
+    json_utils.write_json(p, data)
+    assert p.read_text(encoding='utf-8') == json.dumps(data, ensure_ascii=False, indent=2)
+    assert json_utils.read_json(p) == data
+
+
+def test_stdlib_fallback(tmp_path, monkeypatch):
+    monkeypatch.setattr(json_utils, '_HAS_ORJSON', False)
+    p = tmp_path / 'cache.json'
+    json_utils.write_json(p, {1: 'int key'})
+    assert json_utils.read_json(p) == {'1': 'int key'}
@@ -0,0 +1,30 @@
+import logging
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import logging_config
+
+
+def test_configure_logging_short_circuits_repeat_calls(monkeypatch):
+    root = logging.getLogger()
+    monkeypatch.setattr(logging_config, '_CONFIGURED', False)
+    monkeypatch.delenv('LOG_LEVEL', raising=False)
+    old = root.level
+    try:
+        logging_config.configure_logging('WARNING')
+        assert root.level == logging.WARNING
+        root.setLevel(logging.ERROR)
+        logging_config.configure_logging()
+        assert root.level == logging.ERROR
+        logging_config.configure_logging('bogus')
+        assert root.level == logging.INFO
+    finally:
+        root.setLevel(old)
+
+
+def test_level_for_accepts_aliases_and_unknown_names():
+    assert logging_config.level_for('debug') == logging.DEBUG
+    assert logging_config.level_for('warn') == logging.WARNING
+    assert logging_config.level_for('nope') == logging.INFO
@@ -32,3 +32,128 @@ def test_main_batch_cli(monkeypatch, tmp_path):
         pass
 
     assert exit_codes['code'] == 0
+
+
+def test_process_urls_keeps_per_host_order(monkeypatch):
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+    import main
+
+    seen = []
+    rebuilds = []
+    monkeypatch.setattr(main, '_process_url', lambda url, mode: seen.append((url, mode)))
+    monkeypatch.setattr(main, '_rebuild_artifacts_csv', lambda: rebuilds.append(1))
+    urls = ['https://a.com/1', 'https://www.b.com/1', 'https://a.com/2', 'https://c.com/1', 'https://b.com/2']
+    main._process_urls(urls, 'text-only', concurrency=3)
+    assert rebuilds == [1]
+    assert sorted(seen) == sorted((u, 'text-only') for u in urls)
+    order = [u for u, _m in seen]
+    assert order.index('https://a.com/1') < order.index('https://a.com/2')
+    assert order.index('https://www.b.com/1') < order.index('https://b.com/2')
+
+
+def test_latest_run_finds_slugified_host_dirs(monkeypatch, tmp_path):
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+    import main
+
+    monkeypatch.chdir(tmp_path)
+    main._latest_run.cache_clear()
+    for run in ('20240101_000000', '20250101_000000'):
+        (tmp_path / 'artifacts' / 'news_example_com' / run).mkdir(parents=True)
+    host = main._host_of('https://www.news.example.com/story')
+    assert host == 'news.example.com'
+    assert main._latest_run(host).name == '20250101_000000'
+    assert main._latest_run('other.example.com') is None
+    main._latest_run.cache_clear()
+
+
+def test_host_of_matches_artifact_writer_normalization():
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+    import main
+    from accident_utils import url_domain
+
+    for url in ('https://www.a.com/x', 'https://news.www.example.org/y', 'https://b.com'):
+        assert main._host_of(url) == url_domain(url)
+    assert main._host_of('https://news.www.example.org/y') == 'news.example.org'
+
+
+def test_latest_run_orders_by_timestamp_name_not_mtime(monkeypatch, tmp_path):
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+    import os
+    import main
+
+    monkeypatch.chdir(tmp_path)
+    main._latest_run.cache_clear()
+    base = tmp_path / 'artifacts' / 'a_com'
+    # the older run was re-enriched last, so its mtime is newer
+    for run, mtime in (('20250102_000000', 1_000), ('20240101_000000', 9_000), ('manual_b', 5_000), ('manual_a', 7_000)):
+        (base / run).mkdir(parents=True)
+        os.utime(base / run, (mtime, mtime))
+    assert main._latest_run('a.com').name == '20250102_000000'
+    main._latest_run.cache_clear()
+
+    for run in ('20250102_000000', '20240101_000000'):
+        (base / run).rmdir()
+    assert main._latest_run('a.com').name == 'manual_a'
+    main._latest_run.cache_clear()
+
+
+def test_iter_urls_skips_comments_and_splits_commas(tmp_path):
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+    import main
+
+    uf = tmp_path / 'urls.txt'
+    uf.write_text('# comment\n\nhttps://a.com/x, https://b.com/y,\n  https://c.com/z  \n', encoding='utf-8')
+    assert list(main.iter_urls(uf)) == ['https://a.com/x', 'https://b.com/y', 'https://c.com/z']
+
+
+def test_generate_reports_counts_written(monkeypatch):
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+    import main
+
+    calls = []
+
+    def fake_report(eid, audience, family_sensitive, dry_run):
+        calls.append((eid, audience, family_sensitive, dry_run))
+        return None if eid == 'e2' else Path(f'reports/{eid}.md')
+    monkeypatch.setattr(main, '_generate_report', fake_report)
+    wrote = main._generate_reports(['e1', 'e2', 'e3'], audience='general', family_sensitive=True, dry_run=False, concurrency=3)
+    assert wrote == 2
+    assert sorted(calls) == [(e, 'general', True, False) for e in ('e1', 'e2', 'e3')]
+    assert main._generate_reports([], audience='general', family_sensitive=False, dry_run=True) == 0
+
+
+def test_run_service_pipeline_runs_selected_steps(monkeypatch, tmp_path):
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+    import main
+
+    monkeypatch.chdir(tmp_path)
+    fused = tmp_path / 'events' / 'fused'
+    fused.mkdir(parents=True)
+    (fused / 'ev1.json').write_text('{}', encoding='utf-8')
+    calls = []
+    monkeypatch.setattr(main, '_assign_event_ids', lambda **kw: calls.append(('assign', kw)) or {})
+    monkeypatch.setattr(main, '_merge_and_fuse', lambda **kw: calls.append(('merge', kw)) or {})
+    monkeypatch.setattr(main, '_generate_report', lambda eid, **kw: calls.append(('report', eid)) or None)
+    main.run_service_pipeline(run_assign=True, run_merge=False, run_reports=True, dry=True, clear=False)
+    assert calls == [('assign', {'dry_run': True, 'cache_clear': False}), ('report', 'ev1')]
+
+
+def test_ts_print_skips_formatting_when_level_disabled(monkeypatch):
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+    import logging
+    import main
+
+    class Loud:
+        def __str__(self):
+            raise AssertionError('formatted a suppressed message')
+
+    old = main.logger.level
+    main.logger.setLevel(logging.WARNING)
+    try:
+        main.ts_print(Loud(), level='debug')
+        records = []
+        monkeypatch.setattr(main.logger, 'handle', records.append)
+        main.ts_print('a', 1, level='warn')
+    finally:
+        main.logger.setLevel(old)
+    assert [(r.levelno, r.getMessage()) for r in records] == [(logging.WARNING, 'a 1')]
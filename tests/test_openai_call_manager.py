@@ -1,3 +1,4 @@
+import json
 import os
 import tempfile
 from pathlib import Path
@@ -30,3 +31,83 @@ def test_call_cap_enforcement(tmp_path, monkeypatch):
     import openai_call_manager as cm2
     assert cm2.can_make_call() is True
     assert cm2.remaining() is None
+
+
+def test_counter_is_read_once_and_persisted(tmp_path, monkeypatch):
+    state = tmp_path / '.calls.json'
+    state.write_text('{"count": 3}', encoding='utf-8')
+    monkeypatch.setenv('OPENAI_CALLS_PATH', str(state))
+    monkeypatch.setenv('MAX_OPENAI_CALLS', '100')
+    cm = importlib.reload(importlib.import_module('openai_call_manager'))
+
+    assert cm.remaining() == 97
+    reads = []
+    real_read = cm._read_state
+    monkeypatch.setattr(cm, '_read_state', lambda: reads.append(1) or real_read())
+    cm.record_call(1)
+    assert cm.can_make_call() is True
+    assert reads == []
+    cm.flush()
+    assert json.loads(state.read_text(encoding='utf-8')) == {'count': 4}
+    assert [f.name for f in tmp_path.iterdir() if f.suffix == '.tmp'] == []
+
+
+def test_flush_merges_counts_written_by_other_processes(tmp_path, monkeypatch):
+    state = tmp_path / '.calls.json'
+    state.write_text('{"count": 3}', encoding='utf-8')
+    monkeypatch.setenv('OPENAI_CALLS_PATH', str(state))
+    monkeypatch.setenv('MAX_OPENAI_CALLS', '100')
+    cm = importlib.reload(importlib.import_module('openai_call_manager'))
+
+    cm.record_call(2)
+    state.write_text('{"count": 40}', encoding='utf-8')  # another process ran meanwhile
+    cm.flush()
+    assert json.loads(state.read_text(encoding='utf-8')) == {'count': 42}
+    assert cm.remaining() == 58
+
+    state.write_text('{"count": 95}', encoding='utf-8')
+    # near the cap, checks see the other process's calls
+    assert cm.try_reserve(5) is True
+    assert cm.try_reserve(1) is False
+    assert json.loads(state.read_text(encoding='utf-8')) == {'count': 100}
+
+
+def test_counter_writes_are_batched_until_near_cap(tmp_path, monkeypatch):
+    state = tmp_path / '.calls.json'
+    monkeypatch.setenv('OPENAI_CALLS_PATH', str(state))
+    monkeypatch.setenv('MAX_OPENAI_CALLS', '100')
+    cm = importlib.reload(importlib.import_module('openai_call_manager'))
+
+    writes = []
+    real_write = cm._write_state
+    monkeypatch.setattr(cm, '_write_state', lambda st: writes.append(st['count']) or real_write(st))
+    for _ in range(12):
+        cm.record_call()
+    assert writes == [10]
+    cm.flush()
+    assert writes == [10, 12]
+    cm.flush()
+    assert writes == [10, 12]
+    assert json.loads(state.read_text(encoding='utf-8')) == {'count': 12}
+
+    cm.record_call(80)
+    assert writes[-1] == 92
+    cm.record_call()
+    assert writes[-1] == 93
+
+
+def test_try_reserve_never_overshoots_under_threads(tmp_path, monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+
+    monkeypatch.setenv('OPENAI_CALLS_PATH', str(tmp_path / '.calls.json'))
+    monkeypatch.setenv('MAX_OPENAI_CALLS', '5')
+    cm = importlib.reload(importlib.import_module('openai_call_manager'))
+
+    with ThreadPoolExecutor(max_workers=8) as ex:
+        granted = sum(ex.map(lambda _i: cm.try_reserve(1), range(40)))
+    assert granted == 5
+    assert cm.remaining() == 0
+    cm.release(1)
+    assert cm.remaining() == 1
+    assert cm.try_reserve(2) is False
+    assert cm.try_reserve(1) is True
@@ -0,0 +1,54 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import rate_limiter
+
+
+def test_acquire_blocks_when_request_capacity_is_spent(monkeypatch):
+    clock = [1000.0]
+    slept = []
+    monkeypatch.setattr(rate_limiter.time, 'monotonic', lambda: clock[0])
+
+    def fake_sleep(s):
+        slept.append(s)
+        clock[0] += s
+    monkeypatch.setattr(rate_limiter.time, 'sleep', fake_sleep)
+
+    rl = rate_limiter.RateLimiter(max_rpm=60, max_tpm=0)
+    rl._requests = 1.0
+    rl.acquire()
+    assert slept == []
+    rl.acquire()
+    # one request refills every second at 60 RPM
+    assert abs(sum(slept) - 1.0) < 1e-6
+
+
+def test_headers_resize_capacity_and_pause(monkeypatch):
+    clock = [50.0]
+    monkeypatch.setattr(rate_limiter.time, 'monotonic', lambda: clock[0])
+    monkeypatch.setattr(rate_limiter, '_ENV_RPM', 0.0)
+    monkeypatch.setattr(rate_limiter, '_ENV_TPM', 0.0)
+
+    rl = rate_limiter.RateLimiter()
+    rl.update_from_headers({
+        'x-ratelimit-limit-requests': '500',
+        'x-ratelimit-limit-tokens': '30000',
+        'x-ratelimit-remaining-requests': '499',
+        'x-ratelimit-remaining-tokens': '1200',
+        'retry-after': '2',
+    })
+    assert (rl.max_rpm, rl.max_tpm) == (500.0, 30000.0)
+    assert (rl._requests, rl._tokens) == (499.0, 1200.0)
+    assert rl._paused_until == 52.0
+
+
+def test_token_estimator_tracks_observed_usage():
+    est = rate_limiter.TokenEstimator(beta=0.5, gamma=1.0)
+    assert est.estimate('k', default=1234) == 1234
+    est.observe('k', 1000)
+    assert est.estimate('k', default=1234) == 1000
+    est.observe('k', 2000)
+    # mean 1500, var 0.5 * (0 + 0.5 * 1000**2) = 250000 -> std 500
+    assert est.estimate('k', default=1234) == 2000